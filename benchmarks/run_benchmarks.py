@@ -0,0 +1,190 @@
+"""Benchmarks du moteur route_optique sur des ROP/STBAN synthétiques.
+
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 1000000 --output bench_results.json
+
+Chaque phase (lecture Excel, noms de boîtes, index, recherche, prises, segments, rendu, graphe fibre,
+relecture des index persistés) est chronométrée
+et les résultats sont écrits en JSON pour servir de référence et détecter les régressions.
+"""
+import argparse
+from contextlib import contextmanager
+from io import BytesIO
+import json
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import route_optique  # noqa: E402
+from synthetic import make_rop_df, make_stban_df  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+QUERIES_PER_SIZE = 200
+
+def time_call(func, repeat):
+    """Exécute `func` `repeat` fois et retourne (meilleur temps, temps médian, dernier résultat)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings), result
+
+def record(results, phase, rows, func, repeat=1, per_call=1):
+    """Chronomètre une phase et ajoute sa mesure (en secondes, ramenée à un appel) aux résultats."""
+    best, median, result = time_call(func, repeat)
+    results.append({'phase': phase, 'rows': rows, 'best_s': best / per_call, 'median_s': median / per_call,
+                    'repeat': repeat, 'calls': per_call})
+    print(f"{rows:>9} {phase:<32} {best / per_call * 1000:>12.3f} ms", file=sys.stderr)
+    return result
+
+def excel_bytes(df, header):
+    """Écrit un DataFrame en .xlsx en mémoire."""
+    buffer = BytesIO()
+    df.to_excel(buffer, header=header, index=False)
+    return buffer.getvalue()
+
+def bench_size(n_rows, repeat, excel_max_rows, results):
+    """Exécute toutes les phases pour un ROP et un STBAN de `n_rows` lignes."""
+    rop_df = make_rop_df(n_rows)
+    stban_df = make_stban_df(n_rows)
+    rng = np.random.default_rng(42)
+
+    if n_rows <= excel_max_rows:
+        rop_xlsx = excel_bytes(rop_df, header=False)
+        stban_xlsx = excel_bytes(stban_df, header=True)
+        record(results, 'read_excel_rop', n_rows, lambda: pd.read_excel(BytesIO(rop_xlsx), header=None))
+        record(results, 'read_excel_stban', n_rows, lambda: pd.read_excel(BytesIO(stban_xlsx)))
+        record(results, 'read_stban_projected', n_rows, lambda: route_optique.read_stban_projected(stban_xlsx))
+
+    object_bytes = rop_df.memory_usage(deep=True).sum()
+    rop_df = record(results, 'compact_rop_df', n_rows, lambda: route_optique.compact_rop_df(rop_df))
+    results[-1]['object_bytes'] = int(object_bytes)
+    results[-1]['compact_bytes'] = int(rop_df.memory_usage(deep=True).sum())
+
+    schema = record(results, 'resolve_rop_schema', n_rows, lambda: route_optique.resolve_rop_schema(rop_df), repeat)
+    boite_names = record(results, 'extract_boite_names_from_rop_df', n_rows,
+                         lambda: route_optique.extract_boite_names_from_rop_df(rop_df, schema), repeat)
+    queries = rng.choice(boite_names, size=min(QUERIES_PER_SIZE, len(boite_names)), replace=False).tolist()
+
+    record(results, 'search_mask_scan', n_rows, lambda: (rop_df == queries[0]).any(axis=0), repeat)
+    boite_index = record(results, 'build_boite_index', n_rows,
+                         lambda: route_optique.build_boite_index(rop_df, schema=schema), repeat)
+    record(results, 'search_rop_rows', n_rows,
+           lambda: [route_optique.search_rop_rows(rop_df, boite_index, q) for q in queries], repeat, len(queries))
+
+    prises_table = record(results, 'build_prises_count_table', n_rows,
+                          lambda: route_optique.build_prises_count_table(stban_df), repeat)
+    record(results, 'calculate_prises_count', n_rows,
+           lambda: [route_optique.calculate_prises_count(prises_table, q) for q in queries], repeat, len(queries))
+
+    search_index = record(results, 'build_boite_search_index', n_rows,
+                          lambda: route_optique.build_boite_search_index(boite_names))
+    fragments = [q[-5:] for q in queries]
+    record(results, 'search_boite_names', n_rows,
+           lambda: [route_optique.search_boite_names(search_index, f) for f in fragments], repeat, len(fragments))
+    fuzzy_index = record(results, 'build_fuzzy_index', n_rows,
+                         lambda: route_optique.build_fuzzy_index(search_index['lowered']))
+    # Un seul nom démesuré ne doit pas faire exploser la construction (variantes énumérées par longueur)
+    record(results, 'build_fuzzy_index_long_name', n_rows,
+           lambda: route_optique.build_fuzzy_index(list(search_index['lowered']) + ['x' * 120]))
+    # Saisies avec une faute de frappe : deux caractères voisins inversés au milieu du nom
+    typos = [q[:len(q) // 2 - 1] + q[len(q) // 2] + q[len(q) // 2 - 1] + q[len(q) // 2 + 1:] for q in queries]
+    record(results, 'fuzzy_search', n_rows,
+           lambda: [route_optique.fuzzy_search(fuzzy_index, search_index['names'], t) for t in typos], repeat, len(typos))
+
+    segment_table = record(results, 'build_route_segment_table', n_rows,
+                           lambda: route_optique.build_route_segment_table(rop_df), repeat)
+    sample_rows = rng.integers(1, len(rop_df), size=QUERIES_PER_SIZE)
+    record(results, 'render_route_html', n_rows,
+           lambda: [route_optique.render_route_html(rop_df.iloc[r], rop_df, segment_table) for r in sample_rows],
+           repeat, len(sample_rows))
+    for file_format in ('csv', 'xlsx'):
+        record(results, f'route_export_{file_format}', n_rows,
+               lambda: route_optique.route_export_file(route_optique.iter_route_export(
+                   rop_df, boite_index, prises_table, segment_table, queries), file_format).close(),
+               repeat, len(queries))
+
+    reverse_index = record(results, 'build_reverse_index', n_rows,
+                           lambda: route_optique.build_reverse_index(segment_table), repeat)
+    cable_keys = [key for key in reverse_index if key.startswith('cable|')][:QUERIES_PER_SIZE]
+    record(results, 'reverse_lookup', n_rows,
+           lambda: [route_optique.reverse_lookup(reverse_index, 'cable', key.split('|', 1)[1]) for key in cable_keys],
+           repeat, len(cable_keys))
+
+    fiber_graph = record(results, 'build_fiber_graph', n_rows,
+                         lambda: route_optique.build_fiber_graph(rop_df, segment_table, schema))
+    record(results, 'shortest_path', n_rows,
+           lambda: [route_optique.shortest_path(fiber_graph, q, queries[-1]) for q in queries], repeat, len(queries))
+
+    fulltext_index = record(results, 'build_fulltext_index', n_rows,
+                            lambda: route_optique.build_fulltext_index(rop_df))
+    record(results, 'fulltext_search', n_rows,
+           lambda: [route_optique.fulltext_search(fulltext_index, f) for f in fragments], repeat, len(fragments))
+
+    # Démarrage à chaud : relecture des index persistés sur disque au lieu de leur reconstruction
+    digest = f"benchmark-{n_rows}"
+    route_optique.save_rop_indexes(digest, {'row_hashes': route_optique.hash_rows(rop_df),
+                                            'boite_index': boite_index, 'route_segments': segment_table,
+                                            'reverse_index': reverse_index, 'boite_names': boite_names})
+    route_optique.save_fulltext_index(digest, fulltext_index)
+    record(results, 'load_rop_indexes', n_rows, lambda: route_optique.load_rop_indexes(digest), repeat)
+    record(results, 'load_fulltext_index', n_rows, lambda: route_optique.load_fulltext_index(digest), repeat)
+
+@contextmanager
+def isolated_caches():
+    """Redirige les caches disque (index, Parquet) vers un répertoire temporaire, supprimé à la fin.
+
+    Les benchmarks ne touchent ainsi ni aux entrées du cache de l'application ni à leur nettoyage.
+    """
+    from route_optique import index_store, loading
+
+    saved = index_store.INDEX_CACHE_DIR, loading.EXCEL_CACHE_DIR
+    with tempfile.TemporaryDirectory(prefix='rop-benchmarks-') as cache_dir:
+        index_store.INDEX_CACHE_DIR = Path(cache_dir) / 'index'
+        loading.EXCEL_CACHE_DIR = Path(cache_dir) / 'excel'
+        try:
+            yield
+        finally:
+            index_store.INDEX_CACHE_DIR, loading.EXCEL_CACHE_DIR = saved
+
+def main(argv=None):
+    """Point d'entrée des benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="nombres de lignes à tester")
+    parser.add_argument('--repeat', type=int, default=3, help="répétitions par phase (le meilleur temps est retenu)")
+    parser.add_argument('--excel-max-rows', type=int, default=100_000,
+                        help="taille maximale pour les phases de lecture Excel (écriture du classeur coûteuse)")
+    parser.add_argument('--output', type=Path, help="fichier JSON de résultats (sortie standard par défaut)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with isolated_caches():
+        for n_rows in args.sizes:
+            bench_size(n_rows, args.repeat, args.excel_max_rows, results)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload + '\n', encoding='utf-8')
+    else:
+        print(payload)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+"""Génération de fichiers ROP et STBAN synthétiques pour les benchmarks."""
+import numpy as np
+import pandas as pd
+
+ROP_STATUSES = np.array(['STOCKEE', 'STOCKEE', 'STOCKEE', 'EN PASSAGE', 'EPISSUREE'])
+POINT_STATUSES = np.array(['EPISSUREE', 'EN PASSAGE', 'STOCKEE'])
+
+def make_boite_names(n_boxes, seed=0):
+    """Retourne `n_boxes` noms de boîtes PBO distincts, au format des exports."""
+    rng = np.random.default_rng(seed)
+    zones = rng.choice(['TE2', 'TE3', 'TE5', 'NR1'], size=n_boxes)
+    return pd.Series(zones).str.cat(pd.Series(np.arange(n_boxes)).astype(str).str.zfill(6), sep='-PBO-').to_numpy()
+
+def make_rop_df(n_rows, n_groups=3, n_boxes=None, seed=0):
+    """Construit un ROP sans en-tête : ligne 0 de libellés, puis ID, Tiroir, Position et des groupes
+    [Boîte, Route, Extrémité, Statut] dont le statut est 3 colonnes après la boîte."""
+    rng = np.random.default_rng(seed)
+    n_boxes = n_boxes or max(n_rows // 4, 10)
+    boxes = make_boite_names(n_boxes, seed)
+    row_ids = np.arange(n_rows)
+    columns = {
+        'id': pd.Series(row_ids).astype(str).str.zfill(7).radd('ROP-').to_numpy(),
+        'tiroir': pd.Series(row_ids % 24).astype(str).str.zfill(2).radd('Tiroir: T').to_numpy(),
+        'position': pd.Series(row_ids % 144).astype(str).radd('Position: ').to_numpy(),
+    }
+    header = ['ID', 'Tiroir', 'Position']
+    cumulative = np.zeros(n_rows, dtype=np.int64)
+    for group in range(n_groups):
+        lengths = rng.integers(5, 800, size=n_rows)
+        cumulative += lengths
+        cables = pd.Series(rng.integers(0, max(n_rows // 10, 1), size=n_rows)).astype(str).str.zfill(7).radd('TE2-CA-') + '_72F0'
+        route = (cables + ' / ' + pd.Series(lengths).astype(str) + 'ml (' + pd.Series(cumulative).astype(str) + 'ml), T'
+                 + pd.Series(rng.integers(1, 7, size=n_rows)).astype(str) + ', F'
+                 + pd.Series(rng.integers(1, 13, size=n_rows)).astype(str) + f', BPE-{group:02d}, '
+                 + pd.Series(rng.choice(POINT_STATUSES, size=n_rows)))
+        columns[f'boite_{group}'] = boxes[rng.integers(0, n_boxes, size=n_rows)]
+        columns[f'route_{group}'] = route.to_numpy()
+        columns[f'extremite_{group}'] = np.full(n_rows, f'EXTREMITE {group}', dtype=object)
+        columns[f'statut_{group}'] = rng.choice(ROP_STATUSES, size=n_rows)
+        header += ['Boîte', f'Route {group}', f'Extrémité {group}', 'Statut']
+    body = pd.DataFrame(columns).astype(object)
+    body.columns = range(body.shape[1])
+    return pd.concat([pd.DataFrame([header]), body], ignore_index=True)
+
+def make_stban_df(n_rows, n_boxes=None, extra_columns=20, seed=0):
+    """Construit un STBAN avec REF_PBO_PRISE, REF_PBO_PTO, une colonne boîte et des colonnes de remplissage."""
+    rng = np.random.default_rng(seed + 1)
+    n_boxes = n_boxes or max(n_rows // 8, 10)
+    boxes = make_boite_names(n_boxes, seed)
+    prise = boxes[rng.integers(0, n_boxes, size=n_rows)].astype(object)
+    pto = prise.copy()
+    # Une partie des prises a un PTO différent ou vide, comme dans les exports réels
+    other = rng.random(n_rows) < 0.15
+    pto[other] = boxes[rng.integers(0, n_boxes, size=other.sum())]
+    pto[rng.random(n_rows) < 0.05] = ''
+    data = {'ID_PRISE': np.arange(n_rows), 'REF_PBO_PRISE': prise, 'REF_PBO_PTO': pto, 'Boite': prise}
+    for i in range(extra_columns):
+        data[f'ATTRIBUT_{i:02d}'] = rng.integers(0, 1000, size=n_rows)
+    return pd.DataFrame(data)
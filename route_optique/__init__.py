@@ -0,0 +1,134 @@
+"""Moteur de données Route Optique : chargement, index et recherche, sans dépendance à Streamlit."""
+from .autocomplete import BOITE_SUGGESTIONS_LIMIT, build_boite_search_index, search_boite_names
+from .batch import BATCH_REPORT_COLUMNS, batch_report_to_excel, parse_batch_boite_names, run_batch_query
+from .export import (
+    EXPORT_CHUNK_ROWS,
+    ROUTE_EXPORT_COLUMNS,
+    build_route_export_block,
+    iter_route_export,
+    route_export_file,
+    write_route_export_csv,
+    write_route_export_xlsx,
+)
+from .federation import (
+    FEDERATED_REPORT_COLUMNS,
+    FEDERATION_SOURCE_COLUMN,
+    fan_out,
+    pair_stban_files,
+    prepare_federated_files,
+    run_federated_batch_query,
+)
+from .fulltext import FULLTEXT_MIN_QUERY_LENGTH, build_fulltext_index, fulltext_search
+from .fuzzy import FUZZY_MAX_DISTANCE, FUZZY_SUGGESTIONS, build_fuzzy_index, edit_distance, fuzzy_search
+from .graph import (
+    GRAPH_EDGE_COLUMNS,
+    GRAPH_SPLICE_MARKERS,
+    build_fiber_graph,
+    build_route_path_table,
+    downstream_nodes,
+    routes_through,
+    shortest_path,
+)
+from .incremental import (
+    ROP_DIFF_COLUMNS,
+    diff_row_hashes,
+    hash_rows,
+    rop_diff_report,
+    update_prises_components,
+    update_rop_indexes,
+)
+from .index_store import (
+    CACHE_MAX_AGE_SECONDS,
+    INDEX_CACHE_DIR,
+    INDEX_CACHE_MAX_BYTES,
+    index_store_path,
+    load_boite_search_index,
+    load_fulltext_index,
+    load_fuzzy_index,
+    load_rop_indexes,
+    load_stban_indexes,
+    prune_cache_dir,
+    prune_index_store,
+    save_boite_search_index,
+    save_fulltext_index,
+    save_fuzzy_index,
+    save_rop_indexes,
+    save_stban_indexes,
+)
+from .instrumentation import (
+    current_rss_bytes,
+    instrument_phase,
+    measure_phase,
+    phase_stats,
+    record_cache_lookup,
+    render_prometheus,
+    write_prometheus,
+)
+from .loading import (
+    EXCEL_CACHE_DIR,
+    EXCEL_CACHE_MAX_BYTES,
+    content_hash,
+    normalize_excel_df,
+    read_excel_cached,
+    read_stban_cached,
+    read_stban_projected,
+)
+from .lookup import (
+    REVERSE_LOOKUP_KINDS,
+    build_reverse_index,
+    normalize_lookup_value,
+    reverse_lookup,
+    reverse_lookup_key,
+    update_reverse_index,
+)
+from .registry import (
+    DEFAULT_DATASET_TTL_SECONDS,
+    DEFAULT_MEMORY_BUDGET_BYTES,
+    INGESTION_MAX_WORKERS,
+    ROUTE_HTML_CACHE_SIZE,
+    DatasetHandle,
+    DatasetRegistry,
+    DerivedCache,
+    add_derived_nbytes,
+    attach_derived,
+    build_boite_names_dataset,
+    build_rop_dataset,
+    build_stban_dataset,
+    dataset_key,
+    estimate_nbytes,
+    get_fiber_graph,
+    get_fulltext_index,
+    get_route_html_cache,
+)
+from .render import get_color_from_text, get_status_class, render_route_html, render_segment_html
+from .rop import (
+    ROP_COLUMN_ROLES,
+    ROP_SEARCH_STATUS,
+    ROP_SUMMARY_COLUMNS,
+    ROUTE_CABLE_PATTERN,
+    build_boite_index,
+    build_route_segment_table,
+    compact_rop_df,
+    extract_boite_names_from_rop_df,
+    find_rop_boite_columns,
+    get_base_id,
+    get_pbo_tube_fiber,
+    get_route_segments,
+    get_tiroir_pos,
+    normalize_header_label,
+    resolve_rop_schema,
+    search_rop_rows,
+    summarize_rop_rows,
+)
+from .stban import (
+    STBAN_BOITE_COLUMN_NAMES,
+    build_prises_components,
+    build_prises_count_table,
+    calculate_prises_count,
+    extract_stban_boite_names_from_df,
+    find_stban_boite_column,
+    identify_columns,
+    prepare_stban_for_search,
+    prises_from_components,
+    resolve_stban_columns,
+)
@@ -0,0 +1,60 @@
+"""Autocomplétion des noms de boîtes par index de n-grammes."""
+import bisect
+
+import numpy as np
+
+BOITE_SUGGESTIONS_LIMIT = 200
+
+def build_boite_search_index(boite_names):
+    """Construit l'index d'autocomplétion des boîtes (noms en minuscules + listes de n-grammes de 1 à 3 caractères)."""
+    lowered = [name.lower() for name in boite_names]
+    postings = {}
+    for idx, name in enumerate(lowered):
+        grams = {name[i:i + n] for n in (1, 2, 3) for i in range(len(name) - n + 1)}
+        for gram in grams:
+            postings.setdefault(gram, []).append(idx)
+    return {
+        'names': list(boite_names),
+        'lowered': lowered,
+        'sorted_lowered': sorted((name, idx) for idx, name in enumerate(lowered)),
+        'ngrams': {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()},
+    }
+
+def search_boite_names(search_index, query, limit=BOITE_SUGGESTIONS_LIMIT):
+    """Retourne au plus `limit` boîtes contenant `query` : préfixes d'abord, puis par position de la correspondance."""
+    query = query.lower()
+    names, lowered = search_index['names'], search_index['lowered']
+    if not query:
+        return names[:limit]
+
+    # Les correspondances par préfixe sont lues directement dans la liste triée
+    sorted_lowered = search_index['sorted_lowered']
+    start = bisect.bisect_left(sorted_lowered, (query,))
+    prefix_ids = []
+    for name, idx in sorted_lowered[start:start + limit]:
+        if not name.startswith(query):
+            break
+        prefix_ids.append(idx)
+    if len(prefix_ids) == limit:
+        return [names[idx] for idx in prefix_ids]
+
+    # Candidats : intersection des listes des trigrammes de la saisie (ou de la saisie entière si elle est courte)
+    grams = [query] if len(query) < 3 else [query[i:i + 3] for i in range(len(query) - 2)]
+    postings = [search_index['ngrams'].get(gram) for gram in grams]
+    if any(ids is None for ids in postings):
+        return [names[idx] for idx in prefix_ids]
+    postings.sort(key=len)
+    candidates = postings[0]
+    for ids in postings[1:]:
+        candidates = np.intersect1d(candidates, ids, assume_unique=True)
+
+    prefix_set = set(prefix_ids)
+    other = []
+    for idx in candidates.tolist():
+        pos = lowered[idx].find(query)
+        if pos > 0 and idx not in prefix_set:
+            other.append((pos, lowered[idx], idx))
+    other.sort()
+    ranked = prefix_ids + [idx for _, _, idx in other[:limit - len(prefix_ids)]]
+    return [names[idx] for idx in ranked]
+
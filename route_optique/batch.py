@@ -0,0 +1,53 @@
+"""Recherche groupée : ROP et nombre de prises d'une liste de boîtes en un seul rapport."""
+from io import BytesIO
+import re
+
+import numpy as np
+import pandas as pd
+
+from .rop import ROP_SUMMARY_COLUMNS, summarize_rop_rows
+from .stban import calculate_prises_count
+
+BATCH_REPORT_COLUMNS = ['Boîte', 'Nombre de prises'] + ROP_SUMMARY_COLUMNS
+
+def parse_batch_boite_names(text=None, csv_data=None):
+    """Lit une liste de boîtes collée (une par ligne, ou séparées par ; , tabulation) et/ou un CSV (1re colonne)."""
+    names = []
+    if text:
+        names.extend(re.split(r'[\n\r;,\t]+', text))
+    if csv_data:
+        csv_text = csv_data.decode('utf-8-sig', errors='replace')
+        csv_values = [re.split(r'[;,\t]', line, maxsplit=1)[0].strip(' "') for line in csv_text.splitlines()]
+        if csv_values and csv_values[0].strip().lower() in ('boite', 'boîte', 'box'):
+            csv_values = csv_values[1:]
+        names.extend(csv_values)
+    return list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+
+def run_batch_query(df, boite_index, prises_table, segment_table, boite_names):
+    """Résout en un seul passage les ROP 'STOCKEE' et le nombre de prises d'une liste de boîtes.
+
+    Chaque boîte ne coûte qu'une consultation de l'index et de la table des prises ; les lignes ROP
+    de toutes les boîtes sont ensuite rassemblées en une seule fois pour construire le rapport.
+    """
+    hit_rows = {name: boite_index.get(name, np.empty(0, dtype=np.intp)) for name in boite_names}
+    all_rows = np.unique(np.concatenate(list(hit_rows.values()))) if hit_rows else np.empty(0, dtype=np.intp)
+    summary = summarize_rop_rows(df, segment_table, all_rows)
+
+    # Une ligne par ROP trouvée, ou une ligne vide (-1) pour une boîte sans ROP
+    report_rows = [rows if len(rows) else np.array([-1]) for rows in hit_rows.values()]
+    repeats = [len(rows) for rows in report_rows]
+    prises_counts = [calculate_prises_count(prises_table, name) for name in hit_rows]
+    report_df = summary.reindex(np.concatenate(report_rows) if report_rows else np.empty(0, dtype=np.intp))
+    report_df.insert(0, 'Boîte', np.repeat(np.array(list(hit_rows), dtype=object), repeats))
+    report_df.insert(1, 'Nombre de prises', pd.array(np.repeat(np.array(prises_counts, dtype=object), repeats), dtype='Int64'))
+    report_df = report_df.reset_index(drop=True)[BATCH_REPORT_COLUMNS]
+    report_df['ROP'] = report_df['ROP'].astype('Int64')
+    report_df['Longueur totale (ml)'] = report_df['Longueur totale (ml)'].astype('Int64')
+    return report_df
+
+def batch_report_to_excel(report_df):
+    """Sérialise le rapport de recherche groupée au format Excel."""
+    buffer = BytesIO()
+    report_df.to_excel(buffer, index=False, sheet_name='Rapport')
+    return buffer.getvalue()
+
@@ -0,0 +1,94 @@
+"""Interface en ligne de commande : python -m route_optique search --rop ROP.xlsx --stban STBAN.xlsx --box X"""
+import argparse
+from pathlib import Path
+import sys
+
+from .batch import batch_report_to_excel, parse_batch_boite_names, run_batch_query
+from .export import iter_route_export, write_route_export_csv, write_route_export_xlsx
+from .federation import pair_stban_files, prepare_federated_files, run_federated_batch_query
+from .registry import build_rop_dataset, build_stban_dataset
+
+def build_parser():
+    """Construit l'analyseur des arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(prog="rop", description="Recherche de ROP et calcul du nombre de prises par boîte.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="ROP 'STOCKEE' et nombre de prises d'une ou plusieurs boîtes")
+    search.add_argument("--rop", required=True, type=Path, action="append",
+                        help="fichier Excel Route Optique (option répétable : recherche sur plusieurs PM/NRO)")
+    search.add_argument("--stban", type=Path, action="append", default=[],
+                        help="fichier Excel STBAN (optionnel, répétable ; associé au ROP de nom le plus proche)")
+    search.add_argument("--box", action="append", default=[], help="nom de boîte (option répétable)")
+    search.add_argument("--boxes-file", type=Path, help="fichier texte/CSV de boîtes (première colonne)")
+    search.add_argument("--output", type=Path, help="écrit le rapport en .xlsx ou .csv au lieu de l'afficher")
+    search.add_argument("--routes", action="store_true",
+                        help="exporte les routes détaillées (un segment de câble par ligne) dans --output, au fil de l'eau")
+    return parser
+
+def run_search(args):
+    """Exécute la sous-commande `search` et retourne le code de sortie."""
+    boxes_data = args.boxes_file.read_bytes() if args.boxes_file else None
+    boite_names = parse_batch_boite_names("\n".join(args.box), boxes_data)
+    if not boite_names:
+        print("Aucune boîte à rechercher (--box ou --boxes-file).", file=sys.stderr)
+        return 2
+    if args.routes and (len(args.rop) > 1 or args.output is None):
+        print("--routes nécessite un seul fichier --rop et un fichier --output (.xlsx ou .csv).", file=sys.stderr)
+        return 2
+    if len(args.rop) == 1 and len(args.stban) > 1:
+        print("Un seul fichier --stban peut accompagner un seul fichier --rop "
+              "(répétez --rop pour interroger plusieurs PM/NRO).", file=sys.stderr)
+        return 2
+
+    if len(args.rop) > 1:
+        report_df = run_federated_search(args.rop, args.stban, boite_names)
+    else:
+        # Les index déjà persistés sur disque pour ces fichiers sont relus au lieu d'être reconstruits
+        rop_dataset = build_rop_dataset(args.rop[0].read_bytes())
+        prises_table = None
+        if args.stban:
+            prises_table = build_stban_dataset(args.stban[0].read_bytes(), args.stban[0].name)['prises_table']
+            if prises_table is None:
+                print("Colonnes 'REF_PBO_PRISE' ou 'REF_PBO_PTO' introuvables dans le fichier STBAN.", file=sys.stderr)
+
+        if args.routes:
+            blocks = iter_route_export(rop_dataset['df'], rop_dataset['boite_index'], prises_table,
+                                       rop_dataset['route_segments'], boite_names)
+            if args.output.suffix.lower() == ".xlsx":
+                write_route_export_xlsx(blocks, args.output)
+            else:
+                write_route_export_csv(blocks, args.output)
+            return 0
+        report_df = run_batch_query(rop_dataset['df'], rop_dataset['boite_index'], prises_table,
+                                    rop_dataset['route_segments'], boite_names)
+    if args.output is None:
+        print(report_df.to_string(index=False))
+    elif args.output.suffix.lower() == ".xlsx":
+        args.output.write_bytes(batch_report_to_excel(report_df))
+    else:
+        report_df.to_csv(args.output, index=False, sep=";", encoding="utf-8-sig")
+    return 0
+
+def run_federated_search(rop_paths, stban_paths, boite_names):
+    """Recherche les boîtes dans plusieurs couples ROP/STBAN (indexés en parallèle) et retourne le rapport fusionné."""
+    files = {path: path.read_bytes() for path in rop_paths + stban_paths}
+    prepare_federated_files([('rop', files[path], path.name) for path in rop_paths]
+                            + [('stban', files[path], path.name) for path in stban_paths])
+    stban_by_name = {path.name: path for path in stban_paths}
+    pairs = pair_stban_files([path.name for path in rop_paths], list(stban_by_name))
+    sources = []
+    for path in rop_paths:
+        stban_path = stban_by_name.get(pairs[path.name])
+        sources.append({
+            'label': path.name,
+            'rop': build_rop_dataset(files[path]),
+            'stban': build_stban_dataset(files[stban_path], stban_path.name) if stban_path is not None else None,
+        })
+    return run_federated_batch_query(sources, boite_names)
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    args = build_parser().parse_args(argv)
+    if args.command == "search":
+        return run_search(args)
+    return 1
@@ -0,0 +1,10 @@
+"""Listes d'entiers compactées au format CSR (indptr, indices), communes au graphe fibre et à l'index plein texte."""
+import numpy as np
+
+def gather_neighbors(csr, ids):
+    """Retourne (valeurs, ligne d'origine de chaque valeur) des lignes `ids` d'une structure CSR (indptr, indices)."""
+    indptr, indices = csr
+    starts = indptr[ids]
+    lengths = indptr[ids + 1] - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return indices[offsets + np.arange(lengths.sum())], np.repeat(ids, lengths)
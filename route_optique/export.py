@@ -0,0 +1,143 @@
+"""Export détaillé des routes (un segment de câble par ligne) en .xlsx ou .csv, écrit au fil de l'eau.
+
+Le rapport est produit par blocs de lignes ROP (iter_route_export) : seul le bloc courant est
+matérialisé, puis écrit ligne à ligne (xlsxwriter en mode constant_memory) ou ajouté au CSV.
+"""
+import io
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .lookup import LOOKUP_TUBE_FIBRE_PATTERN
+from .rop import summarize_rop_rows
+from .stban import calculate_prises_count
+
+ROUTE_EXPORT_COLUMNS = [
+    'Boîte', 'Nombre de prises', 'ROP', 'Identifiant', 'Tiroir', 'Position',
+    'Câble', 'Longueur segment (ml)', 'Longueur cumulée (ml)', 'Tube', 'Fibre', 'Statut',
+]
+# Nombre de lignes ROP traitées par bloc (borne la mémoire de l'export)
+EXPORT_CHUNK_ROWS = 5_000
+# Détails de câble reconnus comme statuts (mêmes mots que get_status_class)
+EXPORT_STATUS_PATTERN = r'epissure|passage|stockee|ok'
+EXPORT_SHEET_NAME = 'Routes'
+
+def build_route_export_block(df, segment_table, names, prises_counts, rows):
+    """Construit le bloc d'export des couples (boîte, ligne ROP) ; une ligne -1 désigne une boîte sans ROP.
+
+    Une ligne par câble de chaque route (dans l'ordre de la route), ou une ligne aux colonnes de
+    segment vides si la route n'a pas de câble. Tiroir et position suivent les règles de get_tiroir_pos.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    found = np.unique(rows[rows >= 0])
+    summary = summarize_rop_rows(df, segment_table, found).reindex(rows)
+
+    # Segments des lignes du bloc : tranches de la table triée par ligne, rassemblées sans parcourir toute la table
+    segment_rows = segment_table['row'].to_numpy()
+    starts = np.searchsorted(segment_rows, found)
+    lengths = np.searchsorted(segment_rows, found, side='right') - starts
+    positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+    segments = segment_table.iloc[positions]
+    cables = segments[(segments['type'] == 'cable').to_numpy()]
+    tube_fibre = cables['details'].str.extract(LOOKUP_TUBE_FIBRE_PATTERN, flags=re.IGNORECASE)
+    # Statuts calculés une fois par texte de détails distinct
+    detail_codes, detail_values = pd.factorize(cables['details'])
+    statuses = np.array([', '.join(part for part in str(value).split(', ') if re.search(EXPORT_STATUS_PATTERN, part.lower()))
+                         for value in detail_values] + [''], dtype=object)
+    cable_table = pd.DataFrame({
+        'row': cables['row'].to_numpy(),
+        'Câble': cables['name'].to_numpy(),
+        'Longueur segment (ml)': cables['segment_length_ml'].to_numpy(),
+        'Longueur cumulée (ml)': cables['cumulative_length_ml'].to_numpy(),
+        'Tube': tube_fibre[0].str.upper().to_numpy(),
+        'Fibre': tube_fibre[1].str.upper().to_numpy(),
+        'Statut': statuses[detail_codes],
+    })
+
+    pairs = pd.DataFrame({'pair': np.arange(len(rows)), 'row': rows})
+    block = pairs.merge(cable_table, on='row', how='left', sort=False)
+    pair = block['pair'].to_numpy()
+    block.insert(0, 'Boîte', np.asarray(names, dtype=object)[pair])
+    block.insert(1, 'Nombre de prises', pd.array(np.asarray(prises_counts, dtype=object)[pair], dtype='Int64'))
+    for column in ['ROP', 'Identifiant', 'Tiroir', 'Position']:
+        block[column] = summary[column].to_numpy()[pair]
+    block = block[ROUTE_EXPORT_COLUMNS]
+    for column in ['ROP', 'Longueur segment (ml)', 'Longueur cumulée (ml)']:
+        block[column] = block[column].astype('Int64')
+    return block
+
+def iter_route_export(df, boite_index, prises_table, segment_table, boite_names, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Produit par blocs l'export détaillé des ROP 'STOCKEE' d'une liste de boîtes (mêmes ROP que run_batch_query).
+
+    Les couples (boîte, ligne ROP) sont regroupés en blocs d'environ `chunk_rows` lignes ROP ; une
+    boîte sans ROP donne une ligne aux colonnes de route vides.
+    """
+    names, prises_counts, rows, pending = [], [], [], 0
+    for name in boite_names:
+        hit_rows = boite_index.get(name)
+        if hit_rows is None or len(hit_rows) == 0:
+            hit_rows = np.array([-1])
+        names.append(np.full(len(hit_rows), name, dtype=object))
+        prises_counts.append(np.full(len(hit_rows), calculate_prises_count(prises_table, name), dtype=object))
+        rows.append(np.asarray(hit_rows, dtype=np.intp))
+        pending += len(hit_rows)
+        if pending >= chunk_rows:
+            yield build_route_export_block(df, segment_table, np.concatenate(names),
+                                           np.concatenate(prises_counts), np.concatenate(rows))
+            names, prises_counts, rows, pending = [], [], [], 0
+    if rows:
+        yield build_route_export_block(df, segment_table, np.concatenate(names),
+                                       np.concatenate(prises_counts), np.concatenate(rows))
+
+def write_route_export_csv(blocks, target, columns=ROUTE_EXPORT_COLUMNS):
+    """Écrit les blocs en CSV (';', UTF-8 avec BOM) dans `target` (chemin ou fichier binaire), bloc par bloc."""
+    if isinstance(target, (str, bytes)) or hasattr(target, '__fspath__'):
+        with open(target, 'wb') as handle:
+            write_route_export_csv(blocks, handle, columns)
+        return
+    text = io.TextIOWrapper(target, encoding='utf-8-sig', newline='')
+    pd.DataFrame(columns=columns).to_csv(text, index=False, sep=';')
+    for block in blocks:
+        block.to_csv(text, index=False, header=False, sep=';')
+    text.flush()
+    text.detach()
+
+def write_route_export_xlsx(blocks, target, columns=ROUTE_EXPORT_COLUMNS):
+    """Écrit les blocs en .xlsx dans `target` (chemin ou fichier binaire), ligne par ligne.
+
+    En mode constant_memory, xlsxwriter écrit chaque ligne dès qu'elle est complète : la feuille
+    n'est jamais gardée en mémoire.
+    """
+    import xlsxwriter
+
+    # Les textes restent des textes (pas de conversion en liens hypertexte)
+    workbook = xlsxwriter.Workbook(target, {'constant_memory': True, 'strings_to_urls': False})
+    worksheet = workbook.add_worksheet(EXPORT_SHEET_NAME)
+    worksheet.write_row(0, 0, columns)
+    row_number = 1
+    for block in blocks:
+        values = block.astype(object).where(block.notna(), None)
+        for record in values.itertuples(index=False, name=None):
+            worksheet.write_row(row_number, 0, record)
+            row_number += 1
+    workbook.close()
+
+def route_export_file(blocks, file_format):
+    """Écrit l'export des blocs au format 'xlsx' ou 'csv' dans un fichier temporaire et le retourne (téléchargement).
+
+    Le rapport n'est pas gardé en mémoire pendant l'écriture ; le fichier retourné (binaire, non
+    tamponné, relu depuis le début) est supprimé à sa fermeture.
+    """
+    handle = tempfile.TemporaryFile()
+    try:
+        if file_format == 'xlsx':
+            write_route_export_xlsx(blocks, handle)
+        else:
+            write_route_export_csv(blocks, handle)
+        handle.seek(0)
+    except BaseException:
+        handle.close()
+        raise
+    return handle.detach()
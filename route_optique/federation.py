@@ -0,0 +1,105 @@
+"""Recherche fédérée sur plusieurs couples ROP/STBAN (un par PM ou NRO).
+
+Chaque source est indexée indépendamment ; les fichiers sont d'abord parsés et indexés en parallèle
+dans un pool de processus qui remplit les caches disque (Parquet et index projetés en mémoire), puis
+chargés dans le processus du serveur. Une requête est exécutée sur toutes les sources à la fois
+(pool de threads) et les résultats sont fusionnés, étiquetés par fichier source.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
+from pathlib import PurePath
+
+import pandas as pd
+
+from .batch import BATCH_REPORT_COLUMNS, run_batch_query
+from .index_store import index_store_path
+from .loading import content_hash, frame_cache_path, frame_cache_variant
+from .registry import build_rop_dataset, build_stban_dataset
+
+FEDERATION_SOURCE_COLUMN = 'Source'
+FEDERATED_REPORT_COLUMNS = [FEDERATION_SOURCE_COLUMN] + BATCH_REPORT_COLUMNS
+FEDERATION_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+def warm_dataset_caches(kind, data, file_name=None):
+    """Parse et indexe un fichier ROP ou STBAN pour remplir les caches disque ; retourne son empreinte.
+
+    Exécutée dans un processus du pool : seul le SHA-256 revient au processus appelant.
+    """
+    if kind == 'rop':
+        build_rop_dataset(data)
+    else:
+        build_stban_dataset(data, file_name)
+    return content_hash(data)
+
+def prepare_federated_files(files, max_workers=None):
+    """Parse et indexe en parallèle des fichiers (kind, data, file_name) ; les fichiers déjà en cache sont ignorés.
+
+    Les jeux de données se chargent ensuite depuis les caches disque (build_rop_dataset,
+    build_stban_dataset) sans nouveau parsing. Un fichier n'est considéré en cache que si ses index
+    et son DataFrame Parquet le sont tous deux : le nettoyage du cache peut supprimer l'un sans l'autre.
+    """
+    def is_cached(kind, data, file_name):
+        digest = content_hash(data)
+        return (index_store_path(digest, kind).is_dir()
+                and frame_cache_path(digest, frame_cache_variant(kind, file_name)).exists())
+
+    files = [(kind, data, file_name) for kind, data, file_name in files if not is_cached(kind, data, file_name)]
+    if len(files) < 2:
+        return
+    # 'spawn' : un processus fils ne doit pas hériter des threads du serveur
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(max_workers or FEDERATION_MAX_WORKERS, len(files)),
+                             mp_context=context) as pool:
+        list(pool.map(warm_dataset_caches, *zip(*files)))
+
+def pair_stban_files(rop_names, stban_names):
+    """Associe chaque fichier ROP au fichier STBAN dont le nom partage le plus long préfixe avec le sien, ou None.
+
+    Un couple n'est retenu que si chacun est, sans ex aequo, le meilleur choix de l'autre
+    (ex. 'PM12_ROP.xlsx' et 'PM12_STBAN.xlsx', mais pas 'PM13_ROP.xlsx' et 'PM12_STBAN.xlsx').
+    """
+    def stem(name):
+        return PurePath(name).stem.lower()
+
+    def unique_best(scores):
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] == 0 or (len(ranked) > 1 and ranked[1][1] == ranked[0][1]):
+            return None
+        return ranked[0][0]
+
+    scores = {(rop_name, stban_name): len(os.path.commonprefix([stem(rop_name), stem(stban_name)]))
+              for rop_name in rop_names for stban_name in stban_names}
+    pairs = {}
+    for rop_name in rop_names:
+        stban_name = unique_best({stban: scores[rop_name, stban] for stban in stban_names})
+        if stban_name is not None and unique_best({rop: scores[rop, stban_name] for rop in rop_names}) != rop_name:
+            stban_name = None
+        pairs[rop_name] = stban_name
+    return pairs
+
+def fan_out(sources, query, max_workers=None):
+    """Exécute `query(source)` sur toutes les sources en parallèle ; retourne les résultats dans l'ordre des sources."""
+    if len(sources) < 2:
+        return [query(source) for source in sources]
+    with ThreadPoolExecutor(max_workers=min(max_workers or FEDERATION_MAX_WORKERS, len(sources))) as pool:
+        return list(pool.map(query, sources))
+
+def run_federated_batch_query(sources, boite_names, max_workers=None):
+    """Exécute une recherche groupée (voir run_batch_query) sur chaque source et fusionne les rapports.
+
+    `sources` est une liste de dictionnaires {'label', 'rop', 'stban'} (jeux de données du registre,
+    'stban' peut être None). Chaque ligne du rapport est étiquetée par le libellé de sa source.
+    """
+    def query(source):
+        rop_dataset, stban_dataset = source['rop'], source['stban']
+        report_df = run_batch_query(rop_dataset['df'], rop_dataset['boite_index'],
+                                    stban_dataset['prises_table'] if stban_dataset is not None else None,
+                                    rop_dataset['route_segments'], boite_names)
+        report_df.insert(0, FEDERATION_SOURCE_COLUMN, source['label'])
+        return report_df
+
+    reports = fan_out(sources, query, max_workers)
+    if not reports:
+        return pd.DataFrame(columns=FEDERATED_REPORT_COLUMNS)
+    return pd.concat(reports, ignore_index=True)
@@ -0,0 +1,107 @@
+"""Recherche plein texte dans toutes les cellules du ROP par index de trigrammes.
+
+Les valeurs distinctes des cellules (ligne d'en-tête exclue) sont numérotées ; l'index associe à
+chaque valeur les lignes ROP qui la contiennent et à chaque trigramme (trois caractères consécutifs,
+en minuscules) les valeurs où il apparaît. Les deux tables sont stockées en CSR (tableaux numpy).
+"""
+import numpy as np
+import pandas as pd
+
+from .csr import gather_neighbors
+
+FULLTEXT_MIN_QUERY_LENGTH = 3
+# Nombre de valeurs dont les trigrammes sont extraits à la fois (borne la mémoire de construction)
+FULLTEXT_CHUNK_VALUES = 50_000
+
+def encode_trigrams(chars):
+    """Code chaque trigramme d'une suite de points de code (uint32) en un entier 64 bits."""
+    chars = chars.astype(np.int64)
+    return (chars[:-2] << 42) | (chars[1:-1] << 21) | chars[2:]
+
+def extract_trigrams(values):
+    """Retourne les trigrammes codés des valeurs `values` et, pour chacun, la position de sa valeur."""
+    chars = np.frombuffer(('\0'.join(values) + '\0').encode('utf-32-le'), dtype=np.uint32)
+    is_separator = chars == 0
+    value_ids = (np.cumsum(is_separator, dtype=np.int32) - is_separator)[:-2]
+    within = ~(is_separator[:-2] | is_separator[1:-1] | is_separator[2:])
+    return encode_trigrams(chars)[within], value_ids[within]
+
+def build_fulltext_index(df):
+    """Construit l'index plein texte d'un ROP : valeurs distinctes, lignes par valeur, valeurs par trigramme."""
+    values = df.to_numpy(dtype=object)
+    filled = pd.notna(values)
+    filled[:1] = False
+    rows, _ = np.nonzero(filled)
+    cells = pd.Series(values[filled], dtype=object).astype(str).str.strip()
+    keep = (cells != '').to_numpy()
+    codes, uniques = pd.factorize(cells[keep].to_numpy(dtype=object))
+    rows = rows[keep]
+
+    # Lignes de chaque valeur, dédoublonnées par clé entière valeur * n + ligne
+    n_rows = max(len(df), 1)
+    pairs = np.sort(codes.astype(np.int64) * n_rows + rows)
+    pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+    value_indptr = np.searchsorted(pairs // n_rows, np.arange(len(uniques) + 1))
+
+    # Trigrammes extraits par blocs de valeurs, numérotés par ordre d'apparition
+    lowered = pd.Series(uniques, dtype=object).str.lower()
+    vocabulary = pd.Index([], dtype=np.int64)
+    chunks = []
+    for start in range(0, len(lowered), FULLTEXT_CHUNK_VALUES):
+        grams, value_ids = extract_trigrams(lowered.iloc[start:start + FULLTEXT_CHUNK_VALUES].tolist())
+        vocabulary = vocabulary.append(pd.Index(grams).unique().difference(vocabulary))
+        # Paires (trigramme, valeur) dédoublonnées et triées par clé entière trigramme * bloc + valeur
+        keys = np.sort(vocabulary.get_indexer(grams).astype(np.int64) * FULLTEXT_CHUNK_VALUES + value_ids)
+        keys = keys[np.diff(keys, prepend=-1) != 0]
+        chunks.append(((keys // FULLTEXT_CHUNK_VALUES).astype(np.int32),
+                       (keys % FULLTEXT_CHUNK_VALUES + start).astype(np.int32)))
+
+    # Listes de valeurs par trigramme (trigrammes triés) remplies bloc par bloc : les numéros de valeur y restent croissants
+    key_order = np.argsort(vocabulary.to_numpy())
+    ranks = np.empty_like(key_order)
+    ranks[key_order] = np.arange(len(key_order))
+    counts = np.zeros(len(key_order), dtype=np.int64)
+    for gram_ids, _ in chunks:
+        counts += np.bincount(ranks[gram_ids], minlength=len(key_order))
+    gram_indptr = np.concatenate([[0], np.cumsum(counts)])
+    gram_values = np.empty(gram_indptr[-1], dtype=np.int32)
+    fill_positions = gram_indptr[:-1].copy()
+    for gram_ids, value_ids in chunks:
+        group_starts = np.flatnonzero(np.diff(gram_ids, prepend=-1) != 0)
+        group_sizes = np.diff(np.append(group_starts, len(gram_ids)))
+        group_ranks = ranks[gram_ids[group_starts]]
+        gram_values[np.repeat(fill_positions[group_ranks] - group_starts, group_sizes) + np.arange(len(gram_ids))] = value_ids
+        fill_positions[group_ranks] += group_sizes
+    return {
+        'values': lowered.astype(str),
+        'value_rows': (value_indptr, pairs % n_rows),
+        'grams': vocabulary.to_numpy()[key_order],
+        'gram_values': (gram_indptr, gram_values),
+    }
+
+def fulltext_search(fulltext_index, fragment):
+    """Retourne les positions (triées) des lignes ROP dont une cellule contient `fragment` (sans tenir compte de la casse).
+
+    Les valeurs candidates sont l'intersection des listes des trigrammes du fragment ; au-delà de
+    trois caractères, leur contenu est vérifié. Un fragment trop court ne renvoie rien.
+    """
+    fragment = fragment.strip().lower()
+    if len(fragment) < FULLTEXT_MIN_QUERY_LENGTH:
+        return np.empty(0, dtype=np.intp)
+    grams = np.unique(encode_trigrams(np.frombuffer(fragment.encode('utf-32-le'), dtype=np.uint32)))
+    known = np.asarray(fulltext_index['grams'])
+    slots = np.minimum(np.searchsorted(known, grams), len(known) - 1)
+    if len(known) == 0 or (known[slots] != grams).any():
+        return np.empty(0, dtype=np.intp)
+
+    indptr, value_ids = fulltext_index['gram_values']
+    postings = sorted((value_ids[indptr[slot]:indptr[slot + 1]] for slot in slots.tolist()), key=len)
+    candidates = np.asarray(postings[0])
+    for posting in postings[1:]:
+        slots = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+        candidates = candidates[posting[slots] == candidates]
+    if len(fragment) > FULLTEXT_MIN_QUERY_LENGTH:
+        values = fulltext_index['values'].iloc[candidates]
+        candidates = candidates[values.str.contains(fragment, regex=False).to_numpy()]
+    rows, _ = gather_neighbors(fulltext_index['value_rows'], candidates.astype(np.intp))
+    return np.flatnonzero(np.bincount(rows.astype(np.intp)))
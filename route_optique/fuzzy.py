@@ -0,0 +1,103 @@
+"""Recherche approchée des noms de boîtes (fautes de frappe) par index de suppressions symétriques.
+
+Chaque nom (en minuscules) est indexé sous toutes ses variantes obtenues en supprimant jusqu'à
+`max_distance` caractères ; deux noms à distance d'édition au plus `max_distance` partagent au
+moins une variante. Les variantes sont codées par un hachage polynomial 64 bits calculé pour tous
+les noms à la fois (tableaux numpy), puis triées : une requête ne consulte que les variantes de la
+saisie et vérifie la distance exacte des seuls candidats.
+"""
+from itertools import combinations
+
+import numpy as np
+
+FUZZY_MAX_DISTANCE = 2
+FUZZY_SUGGESTIONS = 10
+# En deçà, une saisie a trop de voisins pour que des suggestions aient un sens
+FUZZY_MIN_QUERY_LENGTH = 4
+# Base impaire du hachage (inversible modulo 2**64), et son inverse
+FUZZY_HASH_BASE = 0x100000001B3
+FUZZY_HASH_BASE_INVERSE = pow(FUZZY_HASH_BASE, -1, 2 ** 64)
+
+def deletion_hashes(names, max_distance):
+    """Retourne (clés, positions des noms) des variantes de `names` privées de 0 à `max_distance` caractères.
+
+    Le hachage d'une variante est la somme des caractères restants pondérés par les puissances de
+    la base selon leur rang : il se déduit des sommes préfixes du nom, sans construire la variante.
+    Les noms sont traités par longueur, chaque groupe n'énumérant que les suppressions de sa propre
+    largeur : un nom très long ne fait pas payer ses combinaisons à tous les autres.
+    """
+    lengths = np.array([len(name) for name in names], dtype=np.int64)
+    by_length = np.argsort(lengths, kind='stable')
+    group_lengths, group_starts = np.unique(lengths[by_length], return_index=True)
+    inverse_powers = [np.uint64(pow(FUZZY_HASH_BASE_INVERSE, count, 2 ** 64)) for count in range(max_distance + 1)]
+    keys, ids = [], []
+    for width, group in zip(group_lengths.tolist(), np.split(by_length, group_starts[1:])):
+        chars = np.frombuffer(''.join(names[idx] for idx in group.tolist()).encode('utf-32-le'),
+                              dtype=np.uint32).reshape(len(group), width).astype(np.uint64)
+        powers = np.array([pow(FUZZY_HASH_BASE, position, 2 ** 64) for position in range(width)], dtype=np.uint64)
+        prefix = np.zeros((len(group), width + 1), dtype=np.uint64)
+        np.cumsum(chars * powers, axis=1, out=prefix[:, 1:])
+        group_ids = group.astype(np.int32)
+        for count in range(min(max_distance, width) + 1):
+            for deleted in combinations(range(width), count):
+                bounds = (-1,) + deleted + (width,)
+                key = np.zeros(len(group), dtype=np.uint64)
+                for shift, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+                    key += (prefix[:, stop] - prefix[:, start + 1]) * inverse_powers[shift]
+                keys.append(key)
+                ids.append(group_ids)
+    if not keys:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32)
+    return np.concatenate(keys), np.concatenate(ids)
+
+def build_fuzzy_index(lowered_names, max_distance=FUZZY_MAX_DISTANCE):
+    """Construit l'index de recherche approchée de noms déjà en minuscules : clés de variantes triées et noms associés."""
+    keys, ids = deletion_hashes(list(lowered_names), max_distance)
+    order = np.argsort(keys, kind='stable')
+    return {'keys': keys[order], 'ids': ids[order], 'max_distance': max_distance}
+
+def edit_distance(a, b, limit):
+    """Distance d'édition entre a et b, une transposition de deux caractères voisins comptant pour 1.
+
+    Retourne limit + 1 dès que la distance dépasse `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+def fuzzy_search(fuzzy_index, names, query, limit=FUZZY_SUGGESTIONS, max_distance=None):
+    """Retourne au plus `limit` noms de `names` à distance au plus `max_distance` de `query`, les plus proches d'abord.
+
+    `names` est la liste indexée par build_fuzzy_index (casse d'origine). À distance égale, les
+    noms sont classés par ordre alphabétique.
+    """
+    query = query.strip().lower()
+    max_distance = min(fuzzy_index['max_distance'] if max_distance is None else max_distance,
+                       fuzzy_index['max_distance'])
+    if len(query) < FUZZY_MIN_QUERY_LENGTH:
+        return []
+    query_keys, _ = deletion_hashes([query], max_distance)
+    keys = fuzzy_index['keys']
+    starts = np.searchsorted(keys, query_keys)
+    lengths = np.searchsorted(keys, query_keys, side='right') - starts
+    positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+    candidates = np.unique(np.asarray(fuzzy_index['ids'])[positions]).tolist()
+
+    scored = []
+    for idx in candidates:
+        distance = edit_distance(query, names[idx].lower(), max_distance)
+        if distance <= max_distance:
+            scored.append((distance, names[idx]))
+    scored.sort()
+    return [name for _, name in scored[:limit]]
@@ -0,0 +1,142 @@
+"""Graphe du réseau fibre construit à partir des segments de route du ROP.
+
+Les boîtes (colonnes 'Boîte'), les câbles et les boîtes d'épissure (BPE/CAS des détails de câble)
+sont les nœuds ; deux éléments consécutifs d'une même route forment une arête orientée dans le sens
+de lecture de la route (du tiroir vers les boîtes). Les adjacences sont stockées en CSR (tableaux
+numpy) pour des parcours vectorisés.
+"""
+import numpy as np
+import pandas as pd
+
+from .csr import gather_neighbors
+from .rop import find_rop_boite_columns
+
+# Marqueurs des boîtes d'épissure citées dans les détails d'un câble (mêmes badges que le rendu)
+GRAPH_SPLICE_MARKERS = ('BPE', 'CAS')
+GRAPH_EDGE_COLUMNS = ['Origine', 'Destination', 'Type', 'Routes']
+
+def build_route_path_table(df, segment_table, schema=None):
+    """Retourne, pour chaque route (ligne d'en-tête exclue), la suite ordonnée des éléments traversés.
+
+    Colonnes : row, name, kind ('boite', 'cable' ou 'epissure') et link, le type du lien qui
+    mène à l'élément ('epissure' vers une boîte d'épissure d'un câble épissuré, 'passage' sinon).
+    """
+    segments = segment_table[segment_table['row'] > 0]
+    is_cable = (segments['type'] == 'cable').to_numpy()
+    is_boite = ~is_cable & segments['col'].isin(find_rop_boite_columns(df, schema)).to_numpy()
+    elements = segments[is_cable | is_boite]
+    path = pd.DataFrame({
+        'row': elements['row'].to_numpy(),
+        'col': elements['col'].to_numpy(),
+        'sub': 0,
+        'name': elements['name'].astype(str).to_numpy(),
+        'kind': np.where(is_cable[is_cable | is_boite], 'cable', 'boite'),
+        'link': 'passage',
+    })
+
+    # Les boîtes d'épissure citées dans les détails suivent immédiatement leur câble
+    cables = segments[is_cable]
+    parts = cables['details'].str.split(', ').explode()
+    parts = parts[parts.str.contains('|'.join(GRAPH_SPLICE_MARKERS), regex=True, na=False)]
+    spliced = cables['details'].str.upper().str.contains('EPISSUR', regex=False)
+    splices = pd.DataFrame({
+        'row': cables.loc[parts.index, 'row'].to_numpy(),
+        'col': cables.loc[parts.index, 'col'].to_numpy(),
+        'sub': parts.groupby(level=0).cumcount().to_numpy() + 1,
+        'name': parts.str.strip().to_numpy(),
+        'kind': 'epissure',
+        'link': np.where(spliced.loc[parts.index].to_numpy(), 'epissure', 'passage'),
+    })
+    path = pd.concat([path, splices], ignore_index=True)
+    return path.sort_values(['row', 'col', 'sub'], kind='stable', ignore_index=True)[['row', 'name', 'kind', 'link']]
+
+def build_csr(sources, targets, n_nodes):
+    """Construit une adjacence CSR (indptr, indices) à partir de paires (source, cible)."""
+    order = np.argsort(sources, kind='stable')
+    indptr = np.searchsorted(sources[order], np.arange(n_nodes + 1))
+    return indptr, targets[order]
+
+def build_fiber_graph(df, segment_table, schema=None):
+    """Assemble les routes du ROP en un graphe : nœuds, arêtes dédoublonnées et adjacences CSR.
+
+    Le graphe contient aussi, pour chaque nœud, les lignes ROP des routes qui le traversent.
+    """
+    path = build_route_path_table(df, segment_table, schema)
+    codes, nodes = pd.factorize(path['name'])
+    rows = path['row'].to_numpy()
+    n_nodes = len(nodes)
+
+    # Arêtes dédoublonnées par clé entière source * n + cible (type du premier passage, nombre de routes)
+    keep = (rows[1:] == rows[:-1]) & (codes[1:] != codes[:-1])
+    edge_keys, first, routes = np.unique(codes[:-1][keep].astype(np.int64) * n_nodes + codes[1:][keep],
+                                         return_index=True, return_counts=True)
+    sources, targets = edge_keys // max(n_nodes, 1), edge_keys % max(n_nodes, 1)
+
+    # Lignes ROP traversant chaque nœud, dédoublonnées de la même façon
+    n_rows = int(rows.max()) + 1 if len(rows) else 1
+    node_row_keys = np.unique(codes.astype(np.int64) * n_rows + rows)
+    # factorize numérote les nœuds par ordre d'apparition : chaque nouveau code en marque la première occurrence
+    first_seen = np.flatnonzero(np.diff(np.maximum.accumulate(codes), prepend=-1) > 0)
+    return {
+        'nodes': nodes,
+        'node_ids': {name: idx for idx, name in enumerate(nodes)},
+        'kinds': path['kind'].to_numpy()[first_seen],
+        'edges': pd.DataFrame({
+            'Origine': nodes[sources], 'Destination': nodes[targets],
+            'Type': path['link'].to_numpy()[1:][keep][first], 'Routes': routes,
+        }, columns=GRAPH_EDGE_COLUMNS),
+        'successors': build_csr(sources, targets, n_nodes),
+        'predecessors': build_csr(targets, sources, n_nodes),
+        'node_rows': build_csr(node_row_keys // n_rows, node_row_keys % n_rows, n_nodes),
+    }
+
+def downstream_nodes(graph, name, kinds=('boite',)):
+    """Retourne, triés, les nœuds des types `kinds` atteignables depuis `name` dans le sens des routes.
+
+    Exemple : downstream_nodes(graph, 'BPE-12') liste toutes les boîtes (PBO) desservies par cette BPE.
+    """
+    start = graph['node_ids'].get(name)
+    if start is None:
+        return []
+    seen = np.zeros(len(graph['nodes']), dtype=bool)
+    seen[start] = True
+    frontier = np.array([start])
+    while frontier.size:
+        neighbors, _ = gather_neighbors(graph['successors'], frontier)
+        frontier = np.unique(neighbors[~seen[neighbors]])
+        seen[frontier] = True
+    seen[start] = False
+    found = seen & np.isin(graph['kinds'], kinds)
+    return sorted(graph['nodes'][found].tolist())
+
+def routes_through(graph, name):
+    """Retourne les positions (triées) des lignes ROP dont la route traverse le nœud `name` (câble, boîte)."""
+    node = graph['node_ids'].get(name)
+    if node is None:
+        return np.empty(0, dtype=np.intp)
+    indptr, rows = graph['node_rows']
+    return rows[indptr[node]:indptr[node + 1]]
+
+def shortest_path(graph, source, target):
+    """Retourne le plus court chemin (en nombre d'éléments) entre deux nœuds, sans tenir compte du sens, ou None."""
+    start, goal = graph['node_ids'].get(source), graph['node_ids'].get(target)
+    if start is None or goal is None:
+        return None
+    parents = np.full(len(graph['nodes']), -1, dtype=np.int64)
+    parents[start] = start
+    frontier = np.array([start])
+    while frontier.size and parents[goal] < 0:
+        forward, forward_from = gather_neighbors(graph['successors'], frontier)
+        backward, backward_from = gather_neighbors(graph['predecessors'], frontier)
+        neighbors = np.concatenate([forward, backward])
+        origins = np.concatenate([forward_from, backward_from])
+        unseen = parents[neighbors] < 0
+        neighbors, first = np.unique(neighbors[unseen], return_index=True)
+        parents[neighbors] = origins[unseen][first]
+        frontier = neighbors
+    if parents[goal] < 0:
+        return None
+    path = [goal]
+    while path[-1] != start:
+        path.append(parents[path[-1]])
+    return graph['nodes'][path[::-1]].tolist()
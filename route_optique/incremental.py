@@ -0,0 +1,118 @@
+"""Mise à jour incrémentale des index lorsqu'une nouvelle version d'un fichier ROP ou STBAN est chargée.
+
+Chaque ligne est résumée par une empreinte de 64 bits ; les lignes inchangées sont appariées entre
+les deux versions et seuls les index touchés par les lignes ajoutées ou supprimées sont recalculés.
+"""
+import numpy as np
+import pandas as pd
+
+from .lookup import update_reverse_index
+from .rop import build_boite_index, build_route_segment_table, extract_boite_names_from_rop_df, get_base_id
+from .stban import build_prises_components
+
+ROP_DIFF_COLUMNS = ['Route', 'Changement', 'Ancienne ligne', 'Nouvelle ligne']
+
+def hash_rows(df):
+    """Retourne l'empreinte (uint64) de chaque ligne, indépendante de l'encodage des colonnes."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def diff_row_hashes(old_hashes, new_hashes):
+    """Apparie les lignes identiques de deux versions d'un fichier.
+
+    Retourne `old_to_new` (position de chaque ancienne ligne dans la nouvelle version, -1 si elle
+    a disparu) et `added` (positions des nouvelles lignes sans équivalent). Les doublons sont
+    appariés dans leur ordre d'apparition.
+    """
+    def keys(hashes):
+        occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+        return pd.MultiIndex.from_arrays([hashes, occurrence])
+
+    new_keys = keys(new_hashes)
+    old_to_new = new_keys.get_indexer(keys(old_hashes))
+    matched = np.zeros(len(new_hashes), dtype=bool)
+    matched[old_to_new[old_to_new >= 0]] = True
+    return {'old_to_new': old_to_new, 'added': np.flatnonzero(~matched)}
+
+def row_values(df, positions):
+    """Retourne l'ensemble des valeurs non vides des lignes `positions`."""
+    values = df.iloc[positions].to_numpy(dtype=object).ravel()
+    return set(values[pd.notna(values)].tolist())
+
+def update_segment_table(segment_table, new_df, old_to_new, added):
+    """Reporte les segments des lignes inchangées à leur nouvelle position et parse les seules lignes ajoutées."""
+    new_rows = old_to_new[segment_table['row'].to_numpy()]
+    kept = segment_table[new_rows >= 0].assign(row=new_rows[new_rows >= 0])
+    parsed = build_route_segment_table(new_df.iloc[added])
+    parsed['row'] = added[parsed['row'].to_numpy()]
+    table = pd.concat([kept, parsed], ignore_index=True)
+    return table.sort_values(['row', 'order'], kind='stable', ignore_index=True)
+
+def update_rop_indexes(previous, new_df, row_hashes, schema):
+    """Dérive les index d'une nouvelle version du ROP de ceux de la version précédente.
+
+    Les positions des lignes inchangées sont renumérotées ; seules les boîtes présentes dans des
+    lignes ajoutées ou supprimées sont réindexées et seules les lignes ajoutées sont parsées.
+    Retourne None si les colonnes ou leur carte (`schema`) diffèrent (reconstruction complète nécessaire).
+    """
+    old_df = previous['df']
+    if old_df.shape[1] != new_df.shape[1] or previous['schema'] != schema:
+        return None
+    diff = diff_row_hashes(previous['row_hashes'], row_hashes)
+    old_to_new, added = diff['old_to_new'], diff['added']
+    affected = row_values(old_df, np.flatnonzero(old_to_new < 0)) | row_values(new_df, added)
+
+    boite_index = {value: np.sort(old_to_new[positions])
+                   for value, positions in previous['boite_index'].items() if value not in affected}
+    if affected:
+        boite_index.update(build_boite_index(new_df, values=list(affected), schema=schema))
+    route_segments = update_segment_table(previous['route_segments'], new_df, old_to_new, added)
+    return {
+        'row_hashes': row_hashes,
+        'boite_index': boite_index,
+        'route_segments': route_segments,
+        'reverse_index': update_reverse_index(previous['reverse_index'], route_segments, old_to_new, added),
+        'boite_names': extract_boite_names_from_rop_df(new_df, schema),
+    }
+
+def update_prises_components(previous, new_df, row_hashes):
+    """Met à jour les composantes du nombre de prises avec les seules lignes STBAN ajoutées ou supprimées.
+
+    Retourne None si les colonnes diffèrent ou si la version précédente n'avait pas de prises.
+    """
+    old_df = previous['df']
+    if previous['prises_components'] is None or list(old_df.columns) != list(new_df.columns):
+        return None
+    diff = diff_row_hashes(previous['row_hashes'], row_hashes)
+    counts = previous['prises_components']
+    added = build_prises_components(new_df.iloc[diff['added']])
+    removed = build_prises_components(old_df.iloc[np.flatnonzero(diff['old_to_new'] < 0)])
+    counts = counts.add(added, fill_value=0).sub(removed, fill_value=0).astype(int)
+    return counts[counts.any(axis=1)]
+
+def rop_diff_report(old_df, new_df, old_hashes, new_hashes):
+    """Liste les routes ajoutées, supprimées ou modifiées entre deux versions du ROP (ligne d'en-tête exclue).
+
+    Une route est identifiée par son base_id et son rang parmi les lignes modifiées de même base_id :
+    la k-ième route supprimée et la k-ième route ajoutée d'un même base_id forment une route modifiée,
+    les autres restent supprimées ou ajoutées (un base_id en double n'est donc jamais fusionné).
+    """
+    diff = diff_row_hashes(old_hashes, new_hashes)
+    removed, added = {}, {}
+    for pos in np.flatnonzero(diff['old_to_new'] < 0):
+        if pos > 0:
+            removed.setdefault(get_base_id(old_df.iloc[pos]), []).append(pos)
+    for pos in diff['added']:
+        if pos > 0:
+            added.setdefault(get_base_id(new_df.iloc[pos]), []).append(pos)
+    records = []
+    for route, old_positions in removed.items():
+        new_positions = added.get(route, [])
+        for occurrence, pos in enumerate(old_positions):
+            if occurrence < len(new_positions):
+                records.append((route, 'modifiée', pos + 1, new_positions[occurrence] + 1))
+            else:
+                records.append((route, 'supprimée', pos + 1, None))
+    for route, new_positions in added.items():
+        records.extend((route, 'ajoutée', None, pos + 1) for pos in new_positions[len(removed.get(route, [])):])
+    report = pd.DataFrame(records, columns=ROP_DIFF_COLUMNS)
+    return report.astype({'Ancienne ligne': 'Int64', 'Nouvelle ligne': 'Int64'})
@@ -0,0 +1,304 @@
+"""Persistance sur disque des index dérivés d'un fichier ROP ou STBAN, relus par projection mémoire.
+
+Chaque jeu d'index est rangé dans un répertoire nommé d'après le SHA-256 du fichier source et la
+version du format : listes de positions en .npy (relues avec numpy.memmap), tables et listes de
+chaînes en Arrow IPC (relues par pyarrow.memory_map). Un serveur redémarré retrouve ainsi ses
+index sans les reconstruire.
+
+Le cache est borné : les répertoires d'une autre version du format, ceux qui n'ont pas servi depuis
+CACHE_MAX_AGE_SECONDS et, au-delà de INDEX_CACHE_MAX_BYTES, les moins récemment utilisés sont supprimés
+(prune_cache_dir, à la première utilisation du cache par le processus puis après chaque écriture).
+"""
+from pathlib import Path
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+INDEX_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "index"
+INDEX_CACHE_VERSION = 6
+INDEX_CACHE_MAX_BYTES = 10 * 1024 ** 3
+# Durée de conservation d'une entrée de cache non utilisée (index et Parquet)
+CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+# Âge au-delà duquel un fichier temporaire est considéré comme abandonné (processus interrompu)
+CACHE_TMP_MAX_AGE_SECONDS = 3600
+
+# Erreurs d'écriture ou de relecture qui ramènent simplement à la reconstruction des index
+INDEX_STORE_ERRORS = (OSError, ValueError, TypeError, KeyError, ImportError)
+
+_prune_lock = threading.Lock()
+_pruned_dirs = set()
+
+def cache_entry_size(path):
+    """Retourne la taille sur disque d'un fichier ou d'un répertoire de cache, en octets."""
+    if path.is_dir():
+        return sum(child.stat().st_size for child in path.rglob('*') if child.is_file())
+    return path.stat().st_size
+
+def remove_cache_entry(path):
+    """Supprime un fichier ou un répertoire de cache ; les erreurs (entrée déjà supprimée) sont ignorées."""
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+def prune_cache_dir(directory, current_suffix, max_bytes, max_age_seconds=CACHE_MAX_AGE_SECONDS):
+    """Supprime les entrées périmées d'un répertoire de cache puis les plus anciennes au-delà de `max_bytes`.
+
+    Sont périmées les entrées dont le nom ne finit pas par `current_suffix` (autre version du format),
+    celles dont la date de modification (rafraîchie à chaque relecture) dépasse `max_age_seconds` et
+    les fichiers temporaires abandonnés. Un index déjà projeté en mémoire reste lisible après suppression.
+    """
+    try:
+        entries = list(directory.iterdir())
+    except OSError:
+        return
+    now = time.time()
+    kept = []
+    for path in entries:
+        try:
+            age = now - path.stat().st_mtime
+            if path.name.endswith('.tmp'):
+                if age > CACHE_TMP_MAX_AGE_SECONDS:
+                    remove_cache_entry(path)
+            elif not path.name.endswith(current_suffix) or age > max_age_seconds:
+                remove_cache_entry(path)
+            else:
+                kept.append((now - age, cache_entry_size(path), path))
+        except OSError:
+            continue
+    total = sum(size for _, size, _ in kept)
+    for _, size, path in sorted(kept, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        remove_cache_entry(path)
+        total -= size
+
+def prune_cache_once(directory, current_suffix, max_bytes):
+    """Appelle prune_cache_dir à la première utilisation de `directory` par le processus."""
+    with _prune_lock:
+        if directory in _pruned_dirs:
+            return
+        _pruned_dirs.add(directory)
+    prune_cache_dir(directory, current_suffix, max_bytes)
+
+def touch_cache_entry(path):
+    """Marque une entrée de cache comme utilisée (date de modification), pour l'éviction des plus anciennes."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def prune_index_store():
+    """Applique les limites du cache d'index (version, âge, taille totale)."""
+    prune_cache_dir(INDEX_CACHE_DIR, f"-v{INDEX_CACHE_VERSION}", INDEX_CACHE_MAX_BYTES)
+
+def index_store_path(digest, kind):
+    """Retourne le répertoire des index `kind` du fichier d'empreinte `digest`."""
+    return INDEX_CACHE_DIR / f"{digest}-{kind}-v{INDEX_CACHE_VERSION}"
+
+def write_arrow(path, df):
+    """Écrit un DataFrame en Arrow IPC non compressé (relisible par projection mémoire)."""
+    from pyarrow import feather
+
+    feather.write_feather(df, path, compression='uncompressed')
+
+def read_arrow(path):
+    """Relit un DataFrame Arrow IPC par projection mémoire du fichier."""
+    from pyarrow import feather
+
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+def save_postings(directory, name, postings):
+    """Enregistre un dictionnaire clé -> tableau d'entiers : clés et bornes en Arrow, valeurs concaténées en .npy."""
+    keys = list(postings)
+    lengths = np.fromiter((len(postings[key]) for key in keys), dtype=np.int64, count=len(keys))
+    values = np.concatenate([np.asarray(postings[key]) for key in keys]) if keys else np.empty(0, dtype=np.int64)
+    np.save(directory / f"{name}.npy", values)
+    write_arrow(directory / f"{name}.arrow",
+                pd.DataFrame({'key': pd.Series(keys, dtype=object),
+                              'stop': np.cumsum(lengths)}))
+
+def load_postings(directory, name):
+    """Relit un dictionnaire enregistré par save_postings ; les valeurs sont des tranches du .npy projeté en mémoire."""
+    values = np.load(directory / f"{name}.npy", mmap_mode='r')
+    bounds = read_arrow(directory / f"{name}.arrow")
+    stops = bounds['stop'].tolist()
+    starts = [0] + stops[:-1]
+    return {key: values[start:stop] for key, start, stop in zip(bounds['key'].tolist(), starts, stops)}
+
+def save_strings(directory, name, values):
+    """Enregistre une liste de chaînes en Arrow IPC."""
+    write_arrow(directory / f"{name}.arrow", pd.DataFrame({'value': pd.Series(values, dtype=object)}))
+
+def load_strings(directory, name):
+    """Relit une liste de chaînes enregistrée par save_strings."""
+    return read_arrow(directory / f"{name}.arrow")['value'].tolist()
+
+def write_index_store(digest, kind, write):
+    """Écrit un jeu d'index dans un répertoire temporaire puis le publie d'un bloc.
+
+    `write(directory)` remplit le répertoire ; en cas d'échec, rien n'est publié et les
+    index restent simplement en mémoire.
+    """
+    prune_cache_once(INDEX_CACHE_DIR, f"-v{INDEX_CACHE_VERSION}", INDEX_CACHE_MAX_BYTES)
+    target = index_store_path(digest, kind)
+    if target.exists():
+        return
+    tmp_dir = None
+    try:
+        INDEX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Nom unique : deux threads ou processus peuvent écrire le même jeu d'index en même temps
+        tmp_dir = Path(tempfile.mkdtemp(dir=INDEX_CACHE_DIR, prefix=f"{target.name}.", suffix='.tmp'))
+        write(tmp_dir)
+        os.replace(tmp_dir, target)
+    except INDEX_STORE_ERRORS:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    prune_index_store()
+
+def read_index_store(digest, kind, read):
+    """Relit un jeu d'index avec `read(directory)` ; retourne None s'il est absent ou illisible."""
+    prune_cache_once(INDEX_CACHE_DIR, f"-v{INDEX_CACHE_VERSION}", INDEX_CACHE_MAX_BYTES)
+    directory = index_store_path(digest, kind)
+    if not directory.is_dir():
+        return None
+    try:
+        indexes = read(directory)
+    except INDEX_STORE_ERRORS:
+        return None
+    touch_cache_entry(directory)
+    return indexes
+
+def save_rop_indexes(digest, dataset):
+    """Enregistre les empreintes de lignes, les index des boîtes et de recherche inverse, la table des segments et les noms de boîtes d'un ROP."""
+    # Seules des clés texte sont relisibles à l'identique depuis Arrow
+    if not all(isinstance(key, str) for key in dataset['boite_index']):
+        return
+
+    def write(directory):
+        np.save(directory / 'row_hashes.npy', dataset['row_hashes'])
+        save_postings(directory, 'boite_index', dataset['boite_index'])
+        write_arrow(directory / 'route_segments.arrow', dataset['route_segments'])
+        save_postings(directory, 'reverse_index', dataset['reverse_index'])
+        save_strings(directory, 'boite_names', dataset['boite_names'])
+
+    write_index_store(digest, 'rop', write)
+
+def load_rop_indexes(digest):
+    """Relit les index d'un ROP enregistrés par save_rop_indexes, ou None."""
+    def read(directory):
+        return {
+            'row_hashes': np.load(directory / 'row_hashes.npy', mmap_mode='r'),
+            'boite_index': load_postings(directory, 'boite_index'),
+            'route_segments': read_arrow(directory / 'route_segments.arrow'),
+            'reverse_index': load_postings(directory, 'reverse_index'),
+            'boite_names': load_strings(directory, 'boite_names'),
+        }
+
+    return read_index_store(digest, 'rop', read)
+
+def save_fulltext_index(digest, fulltext_index):
+    """Enregistre l'index plein texte d'un ROP (valeurs distinctes, lignes par valeur, valeurs par trigramme)."""
+    def write(directory):
+        write_arrow(directory / 'values.arrow', pd.DataFrame({'value': fulltext_index['values']}))
+        for name in ('value_rows', 'gram_values'):
+            indptr, indices = fulltext_index[name]
+            np.save(directory / f"{name}_indptr.npy", indptr)
+            np.save(directory / f"{name}.npy", indices)
+        np.save(directory / 'grams.npy', fulltext_index['grams'])
+
+    write_index_store(digest, 'fulltext', write)
+
+def load_fulltext_index(digest):
+    """Relit l'index plein texte enregistré par save_fulltext_index, ou None."""
+    def read(directory):
+        fulltext_index = {'values': read_arrow(directory / 'values.arrow')['value'],
+                          'grams': np.load(directory / 'grams.npy', mmap_mode='r')}
+        for name in ('value_rows', 'gram_values'):
+            fulltext_index[name] = (np.load(directory / f"{name}_indptr.npy", mmap_mode='r'),
+                                    np.load(directory / f"{name}.npy", mmap_mode='r'))
+        return fulltext_index
+
+    return read_index_store(digest, 'fulltext', read)
+
+def save_stban_indexes(digest, dataset):
+    """Enregistre les empreintes de lignes, les composantes du nombre de prises et les noms de boîtes d'un STBAN."""
+    prises_components = dataset['prises_components']
+    if prises_components is not None and not all(isinstance(key, str) for key in prises_components.index):
+        return
+
+    def write(directory):
+        np.save(directory / 'row_hashes.npy', dataset['row_hashes'])
+        if prises_components is not None:
+            write_arrow(directory / 'prises_components.arrow', prises_components.rename_axis('Boîte').reset_index())
+        save_strings(directory, 'boite_names', dataset['boite_names'])
+
+    write_index_store(digest, 'stban', write)
+
+def load_stban_indexes(digest):
+    """Relit les index d'un STBAN enregistrés par save_stban_indexes, ou None."""
+    def read(directory):
+        prises_components = None
+        if (directory / 'prises_components.arrow').exists():
+            prises_components = read_arrow(directory / 'prises_components.arrow').set_index('Boîte').rename_axis(None)
+        return {
+            'row_hashes': np.load(directory / 'row_hashes.npy', mmap_mode='r'),
+            'prises_components': prises_components,
+            'boite_names': load_strings(directory, 'boite_names'),
+        }
+
+    return read_index_store(digest, 'stban', read)
+
+def save_boite_search_index(digest, search_index):
+    """Enregistre l'index d'autocomplétion des boîtes (noms, ordre trié, listes de n-grammes)."""
+    def write(directory):
+        save_strings(directory, 'names', search_index['names'])
+        np.save(directory / 'sorted_order.npy',
+                np.array([idx for _, idx in search_index['sorted_lowered']], dtype=np.int64))
+        save_postings(directory, 'ngrams', search_index['ngrams'])
+
+    write_index_store(digest, 'boites', write)
+
+def load_boite_search_index(digest):
+    """Relit l'index d'autocomplétion enregistré par save_boite_search_index, ou None."""
+    def read(directory):
+        names = load_strings(directory, 'names')
+        lowered = [name.lower() for name in names]
+        sorted_order = np.load(directory / 'sorted_order.npy', mmap_mode='r')
+        return {
+            'names': names,
+            'lowered': lowered,
+            'sorted_lowered': [(lowered[idx], idx) for idx in sorted_order.tolist()],
+            'ngrams': load_postings(directory, 'ngrams'),
+        }
+
+    return read_index_store(digest, 'boites', read)
+
+def save_fuzzy_index(digest, fuzzy_index):
+    """Enregistre l'index de recherche approchée des boîtes (clés de variantes triées et noms associés)."""
+    def write(directory):
+        np.save(directory / 'keys.npy', fuzzy_index['keys'])
+        np.save(directory / 'ids.npy', fuzzy_index['ids'])
+        np.save(directory / 'max_distance.npy', np.array(fuzzy_index['max_distance']))
+
+    write_index_store(digest, 'fuzzy', write)
+
+def load_fuzzy_index(digest):
+    """Relit l'index de recherche approchée enregistré par save_fuzzy_index, ou None."""
+    def read(directory):
+        return {
+            'keys': np.load(directory / 'keys.npy', mmap_mode='r'),
+            'ids': np.load(directory / 'ids.npy', mmap_mode='r'),
+            'max_distance': int(np.load(directory / 'max_distance.npy')),
+        }
+
+    return read_index_store(digest, 'fuzzy', read)
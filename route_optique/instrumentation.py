@@ -0,0 +1,129 @@
+"""Mesure des phases coûteuses : temps, nombre d'appels, succès du cache et variation de mémoire (RSS).
+
+Les compteurs sont communs à tout le processus (toutes les sessions) ; chaque mesure est aussi émise
+en ligne de log JSON sur le logger `route_optique.perf` et peut être exportée au format Prometheus.
+"""
+from contextlib import contextmanager
+import functools
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger('route_optique.perf')
+
+_lock = threading.Lock()
+_phases = {}
+_cache_misses = {}
+
+def current_rss_bytes():
+    """Retourne la mémoire résidente du processus en octets (None si indisponible)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss est un pic (en Ko sous Linux, en octets sous macOS), faute de mieux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+@contextmanager
+def measure_phase(phase):
+    """Chronomètre le bloc et cumule temps, appels et variation de RSS pour `phase`."""
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        rss_after = current_rss_bytes()
+        rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+        with _lock:
+            stats = _phases.setdefault(phase, {'calls': 0, 'seconds_total': 0.0, 'seconds_max': 0.0,
+                                               'seconds_last': 0.0, 'rss_delta_bytes_total': 0})
+            stats['calls'] += 1
+            stats['seconds_total'] += elapsed
+            stats['seconds_max'] = max(stats['seconds_max'], elapsed)
+            stats['seconds_last'] = elapsed
+            stats['rss_delta_bytes_total'] += rss_delta
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({'event': 'phase', 'phase': phase, 'seconds': round(elapsed, 6),
+                                    'rss_delta_bytes': rss_delta, 'rss_bytes': rss_after}))
+
+def instrument_phase(phase, func):
+    """Retourne `func` enveloppée dans measure_phase(phase)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with measure_phase(phase):
+            return func(*args, **kwargs)
+    return wrapper
+
+def record_cache_lookup(phase, hit):
+    """Compte un appel de `phase` servi par un cache (hit) ou ayant exécuté le calcul.
+
+    Les succès sont déduits du nombre d'appels mesurés de la phase : `phase` doit aussi être mesurée par measure_phase.
+    """
+    with _lock:
+        _cache_misses[phase] = _cache_misses.get(phase, 0) + (0 if hit else 1)
+
+def phase_stats():
+    """Retourne un instantané des mesures : une entrée par phase, avec succès/échecs du cache le cas échéant."""
+    with _lock:
+        snapshot = []
+        for phase, stats in sorted(_phases.items()):
+            entry = {'phase': phase, **stats}
+            if phase in _cache_misses:
+                entry['cache_misses'] = _cache_misses[phase]
+                entry['cache_hits'] = max(stats['calls'] - _cache_misses[phase], 0)
+            snapshot.append(entry)
+        return snapshot
+
+def render_prometheus():
+    """Retourne les mesures au format texte d'exposition Prometheus."""
+    lines = []
+    metrics = [
+        ('route_optique_phase_calls_total', 'counter', 'Nombre d\'exécutions de la phase', 'calls'),
+        ('route_optique_phase_seconds_total', 'counter', 'Temps cumulé passé dans la phase', 'seconds_total'),
+        ('route_optique_phase_seconds_max', 'gauge', 'Durée maximale d\'une exécution de la phase', 'seconds_max'),
+        ('route_optique_phase_rss_delta_bytes_total', 'counter', 'Variation cumulée de la mémoire résidente', 'rss_delta_bytes_total'),
+        ('route_optique_cache_hits_total', 'counter', 'Appels servis par le cache', 'cache_hits'),
+        ('route_optique_cache_misses_total', 'counter', 'Appels ayant exécuté la fonction', 'cache_misses'),
+    ]
+    snapshot = phase_stats()
+    for name, metric_type, help_text, key in metrics:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for entry in snapshot:
+            if key in entry:
+                lines.append(f'{name}{{phase="{entry["phase"]}"}} {entry[key]}')
+    rss = current_rss_bytes()
+    if rss is not None:
+        lines.append('# HELP route_optique_process_rss_bytes Mémoire résidente du processus')
+        lines.append('# TYPE route_optique_process_rss_bytes gauge')
+        lines.append(f'route_optique_process_rss_bytes {rss}')
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(path):
+    """Écrit les mesures au format Prometheus dans `path` (remplacement atomique, pour le textfile collector).
+
+    Chaque écriture passe par son propre fichier temporaire : plusieurs sessions peuvent exporter en même temps.
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            handle.write(render_prometheus())
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
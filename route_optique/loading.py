@@ -0,0 +1,120 @@
+"""Chargement des fichiers Excel ROP et STBAN, avec cache Parquet indexé par contenu."""
+from io import BytesIO
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+
+from .index_store import prune_cache_dir, prune_cache_once, touch_cache_entry
+from .stban import resolve_stban_columns
+
+EXCEL_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "excel"
+EXCEL_CACHE_VERSION = 1
+EXCEL_CACHE_MAX_BYTES = 5 * 1024 ** 3
+STBAN_PROGRESS_STEP = 5000
+
+def normalize_excel_df(df, header):
+    """Rend un DataFrame lu depuis Excel stockable en Parquet (noms de colonnes, colonnes mixtes)."""
+    df.columns = range(df.shape[1]) if header is None else [str(col) for col in df.columns]
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+            df[col] = values.where(values.isna(), values.astype(str))
+    return df
+
+def content_hash(data):
+    """Retourne l'empreinte SHA-256 (hexadécimale) du contenu d'un fichier."""
+    return hashlib.sha256(data).hexdigest()
+
+def frame_cache_path(digest, variant):
+    """Retourne le fichier Parquet du DataFrame `variant` du fichier d'empreinte `digest`."""
+    return EXCEL_CACHE_DIR / f"{digest}-{variant}-v{EXCEL_CACHE_VERSION}.parquet"
+
+def frame_cache_variant(kind, file_name=None):
+    """Retourne la variante de cache Parquet utilisée pour un fichier 'rop' ou 'stban' (voir read_stban_cached)."""
+    if kind == 'rop':
+        return 'raw'
+    if file_name is not None and file_name.lower().endswith('.xlsx'):
+        return 'stban-projected'
+    return 'header0'
+
+def load_cached_frame(data, variant, header, parse):
+    """Retourne le DataFrame en cache pour ce contenu, ou le parse puis l'enregistre en Parquet.
+
+    Le cache est borné comme celui des index (voir prune_cache_dir) : versions antérieures, fichiers
+    inutilisés depuis longtemps et, au-delà de EXCEL_CACHE_MAX_BYTES, les plus anciens sont supprimés.
+    """
+    suffix = f"-v{EXCEL_CACHE_VERSION}.parquet"
+    prune_cache_once(EXCEL_CACHE_DIR, suffix, EXCEL_CACHE_MAX_BYTES)
+    cache_path = frame_cache_path(content_hash(data), variant)
+    if cache_path.exists():
+        try:
+            df = normalize_excel_df(pd.read_parquet(cache_path), header)
+        except (OSError, ValueError):
+            pass
+        else:
+            touch_cache_entry(cache_path)
+            return df
+    df = normalize_excel_df(parse(), header)
+    tmp_path = None
+    try:
+        EXCEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=EXCEL_CACHE_DIR, prefix=f"{cache_path.name}.", suffix='.tmp')
+        os.close(fd)
+        df.rename(columns=str).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except (OSError, ValueError, TypeError, ImportError):
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        return df
+    prune_cache_dir(EXCEL_CACHE_DIR, suffix, EXCEL_CACHE_MAX_BYTES)
+    return df
+
+def read_excel_cached(data, header=0):
+    """Lit le contenu d'un fichier Excel en ne le parsant qu'une fois par contenu.
+
+    Le DataFrame est conservé en Parquet sous le SHA-256 des octets du fichier : un même
+    fichier rechargé (autre session, redémarrage du serveur) est relu sans passer par openpyxl.
+    """
+    variant = 'raw' if header is None else f'header{header}'
+    return load_cached_frame(data, variant, header, lambda: pd.read_excel(BytesIO(data), header=header))
+
+def read_stban_projected(data, progress=None):
+    """Lit un STBAN .xlsx en flux (openpyxl read-only) en ne gardant que les colonnes utiles.
+
+    Seule la ligne d'en-tête est interprétée pour résoudre les colonnes PRISE, PTO et boîte ;
+    les lignes sont ensuite parcourues une à une et seules ces colonnes sont matérialisées.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(val) if val is not None else f"Unnamed: {i}" for i, val in enumerate(next(rows, ()))]
+        wanted = resolve_stban_columns(header)
+        positions = [header.index(col) for col in wanted]
+        columns = {col: [] for col in wanted}
+        total_rows = max((sheet.max_row or 0) - 1, 1)
+        for row_number, row in enumerate(rows, 1):
+            for col, pos in zip(wanted, positions):
+                columns[col].append(row[pos] if pos < len(row) else None)
+            if progress and row_number % STBAN_PROGRESS_STEP == 0:
+                progress(min(row_number / total_rows, 1.0))
+    finally:
+        workbook.close()
+    if progress:
+        progress(1.0)
+    return pd.DataFrame(columns)
+
+def read_stban_cached(data, file_name, progress=None):
+    """Charge le STBAN : lecture en flux des seules colonnes utiles pour un .xlsx, lecture complète sinon."""
+    if not file_name.lower().endswith('.xlsx'):
+        return read_excel_cached(data)
+    return load_cached_frame(data, 'stban-projected', 0, lambda: read_stban_projected(data, progress))
+
@@ -0,0 +1,97 @@
+"""Recherche inverse des routes ROP par câble, tube/fibre ou tiroir/position.
+
+L'index est un dictionnaire clé -> positions (triées) des lignes ROP, construit au chargement à
+partir de la table des segments ; une clé est le type de recherche suivi des valeurs normalisées,
+par exemple 'cable_tube_fibre|TE2-CA-0000101_72F0|T1|F3' ou 'tiroir_position|T01|12'.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Tube et fibre dans les détails normalisés d'un câble ('T1, F3, BPE-2, EPISSUREE')
+LOOKUP_TUBE_FIBRE_PATTERN = r'(?:^|, )(T\d+), (F\d+)(?=,|$)'
+
+# Types de clés de l'index et valeurs attendues pour chacun
+REVERSE_LOOKUP_KINDS = {
+    'cable': ('câble',),
+    'tube_fibre': ('tube', 'fibre'),
+    'cable_tube_fibre': ('câble', 'tube', 'fibre'),
+    'tiroir': ('tiroir',),
+    'tiroir_position': ('tiroir', 'position'),
+}
+
+def normalize_lookup_value(value):
+    """Normalise une valeur de recherche : texte après un éventuel libellé ('Tiroir: T01' -> 'T01'), en majuscules."""
+    return str(value).split(':')[-1].strip().upper()
+
+def normalize_lookup_values(values):
+    """Version vectorisée de normalize_lookup_value sur une Series de textes."""
+    return values.astype(str).str.split(':').str[-1].str.strip().str.upper()
+
+def reverse_lookup_key(kind, *values):
+    """Retourne la clé d'index d'une recherche `kind` sur `values`."""
+    return '|'.join([kind, *(normalize_lookup_value(value) for value in values)])
+
+def build_reverse_index(segment_table):
+    """Construit l'index de recherche inverse à partir des segments de route (ligne d'en-tête exclue).
+
+    Les tubes et fibres sont lus dans les détails des câbles (T1, F3) ; le tiroir et la position
+    d'une ligne sont, comme dans get_tiroir_pos, les derniers points qui les mentionnent.
+    """
+    segments = segment_table[segment_table['row'] > 0]
+    cables = segments[segments['type'] == 'cable']
+    cable_names = cables['name'].astype(str).str.strip().str.upper()
+    tube_fibre = cables['details'].str.extract(LOOKUP_TUBE_FIBRE_PATTERN, flags=re.IGNORECASE)
+    tubes, fibres = tube_fibre[0].str.upper(), tube_fibre[1].str.upper()
+    has_fibre = (tubes.notna() & fibres.notna()).to_numpy()
+
+    points = segments[segments['type'] == 'point']
+    labels = points['name'].astype(str).str.upper()
+    tiroirs = points[labels.str.contains('TIROIR', regex=False).to_numpy()].groupby('row')['name'].last()
+    positions = points[labels.str.contains('POSITION', regex=False).to_numpy()].groupby('row')['name'].last()
+    tiroirs = normalize_lookup_values(tiroirs)
+    positions = normalize_lookup_values(positions).reindex(tiroirs.index)
+    with_position = positions.notna().to_numpy()
+
+    cable_rows = cables['row'].to_numpy()
+    keys = pd.concat([
+        pd.Series('cable|' + cable_names.to_numpy(), index=cable_rows),
+        pd.Series(('tube_fibre|' + tubes + '|' + fibres).to_numpy()[has_fibre], index=cable_rows[has_fibre]),
+        pd.Series(('cable_tube_fibre|' + cable_names + '|' + tubes + '|' + fibres).to_numpy()[has_fibre],
+                  index=cable_rows[has_fibre]),
+        pd.Series('tiroir|' + tiroirs.to_numpy(), index=tiroirs.index.to_numpy()),
+        pd.Series(('tiroir_position|' + tiroirs + '|' + positions).to_numpy()[with_position],
+                  index=tiroirs.index.to_numpy()[with_position]),
+    ])
+    # Paires (clé, ligne) dédoublonnées et triées par clé entière code * n + ligne, puis découpées par clé
+    codes, uniques = pd.factorize(keys.to_numpy(dtype=object))
+    n_rows = int(segment_table['row'].max()) + 1 if len(segment_table) else 1
+    pairs = np.sort(codes.astype(np.int64) * n_rows + keys.index.to_numpy(dtype=np.int64))
+    pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+    bounds = np.searchsorted(pairs // n_rows, np.arange(len(uniques) + 1))
+    rows = (pairs % n_rows).astype(np.intp)
+    return {key: rows[start:stop] for key, start, stop in zip(uniques.tolist(), bounds[:-1], bounds[1:])}
+
+def update_reverse_index(reverse_index, segment_table, old_to_new, added):
+    """Reporte les lignes inchangées à leur nouvelle position et n'indexe que les lignes ajoutées.
+
+    `segment_table` est la table des segments de la nouvelle version (voir update_segment_table).
+    """
+    index = {}
+    for key, rows in reverse_index.items():
+        moved = old_to_new[rows]
+        moved = np.sort(moved[moved >= 0])
+        if len(moved):
+            index[key] = moved
+    added_index = build_reverse_index(segment_table[segment_table['row'].isin(added)])
+    for key, rows in added_index.items():
+        index[key] = np.union1d(index[key], rows) if key in index else rows
+    return index
+
+def reverse_lookup(reverse_index, kind, *values):
+    """Retourne les positions (triées) des lignes ROP correspondant à la recherche `kind` sur `values`."""
+    rows = reverse_index.get(reverse_lookup_key(kind, *values))
+    if rows is None:
+        return np.empty(0, dtype=np.intp)
+    return rows
@@ -0,0 +1,419 @@
+"""Registre des jeux de données partagé par toutes les sessions d'un même processus.
+
+Un fichier ROP ou STBAN n'est parsé et indexé qu'une fois par contenu : les sessions qui chargent
+le même export reçoivent une poignée (DatasetHandle) vers le même jeu de données. Les entrées qui
+ne sont plus référencées par aucune session restent disponibles et sont évincées par ordre LRU
+lorsque le budget mémoire est dépassé, ou dès qu'elles sont restées inutilisées plus longtemps que
+leur durée de vie. Les clés portent la version du format des index : un jeu de données construit
+par une version antérieure du code n'est jamais réutilisé.
+
+Les fichiers peuvent être construits en arrière-plan (acquire_async) : un ROP et un STBAN sont
+alors parsés et indexés en même temps dans les threads du registre.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .autocomplete import build_boite_search_index
+from .instrumentation import measure_phase, record_cache_lookup
+from .fulltext import build_fulltext_index
+from .fuzzy import FUZZY_MAX_DISTANCE, build_fuzzy_index
+from .graph import build_fiber_graph
+from .incremental import hash_rows, update_prises_components, update_rop_indexes
+from .index_store import (
+    INDEX_CACHE_VERSION,
+    load_boite_search_index,
+    load_fulltext_index,
+    load_fuzzy_index,
+    load_rop_indexes,
+    load_stban_indexes,
+    save_boite_search_index,
+    save_fulltext_index,
+    save_fuzzy_index,
+    save_rop_indexes,
+    save_stban_indexes,
+)
+from .lookup import build_reverse_index
+from .loading import content_hash, read_excel_cached, read_stban_cached
+from .rop import (
+    build_boite_index,
+    build_route_segment_table,
+    compact_rop_df,
+    extract_boite_names_from_rop_df,
+    resolve_rop_schema,
+)
+from .stban import build_prises_components, extract_stban_boite_names_from_df, prises_from_components
+
+DEFAULT_MEMORY_BUDGET_BYTES = 2 * 1024 ** 3
+# Durée de vie par défaut d'un jeu de données non référencé (None : pas d'expiration)
+DEFAULT_DATASET_TTL_SECONDS = None
+# Threads de construction en arrière-plan (un ROP et un STBAN en parallèle)
+INGESTION_MAX_WORKERS = 2
+# Nombre maximal de routes rendues (HTML) gardées en mémoire par fichier ROP
+ROUTE_HTML_CACHE_SIZE = 2000
+
+# Protège la création des verrous de construction des valeurs dérivées et le compte 'derived_nbytes'
+_derived_lock = threading.Lock()
+
+def dataset_key(kind, *parts):
+    """Retourne la clé de registre d'un jeu de données : type, version du format des index et empreintes."""
+    return (kind, f'v{INDEX_CACHE_VERSION}', *parts)
+
+def estimate_nbytes(obj, _seen=None):
+    """Estime la mémoire occupée par un jeu de données (DataFrame, tableaux, dictionnaires, listes)."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(k, seen) + estimate_nbytes(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(item, seen) for item in obj)
+    return sys.getsizeof(obj)
+
+def add_derived_nbytes(dataset, delta):
+    """Ajoute `delta` octets à la taille des valeurs dérivées du jeu de données ('derived_nbytes')."""
+    with _derived_lock:
+        dataset['derived_nbytes'] = dataset.get('derived_nbytes', 0) + delta
+
+def attach_derived(dataset, name, build):
+    """Retourne `dataset[name]`, construit par `build()` à la première demande puis partagé.
+
+    Les sessions qui le demandent pendant la construction attendent celle-ci (une seule construction).
+    Sa taille est ajoutée à celle du jeu de données ('derived_nbytes'), prise en compte par le budget du registre.
+    """
+    value = dataset.get(name)
+    if value is not None:
+        return value
+    with _derived_lock:
+        build_lock = dataset.setdefault('derived_build_locks', {}).setdefault(name, threading.Lock())
+    with build_lock:
+        value = dataset.get(name)
+        if value is None:
+            value = build()
+            dataset[name] = value
+            add_derived_nbytes(dataset, estimate_nbytes(value))
+    return value
+
+class DerivedCache:
+    """Cache LRU borné (nombre d'entrées), protégé par un verrou, de valeurs dérivées d'un jeu de données.
+
+    Sa taille est reportée dans 'derived_nbytes' du jeu de données à chaque ajout et éviction.
+    """
+
+    def __init__(self, dataset, max_entries):
+        self.max_entries = max_entries
+        self._dataset = dataset
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Retourne la valeur de `key` (et la marque comme récemment utilisée), ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        """Ajoute `value` sous `key`, en évinçant les entrées les moins récemment utilisées au-delà de max_entries."""
+        nbytes = estimate_nbytes(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            delta = nbytes - (previous[1] if previous is not None else 0)
+            self._entries[key] = (value, nbytes)
+            while len(self._entries) > self.max_entries:
+                delta -= self._entries.popitem(last=False)[1][1]
+        add_derived_nbytes(self._dataset, delta)
+
+    def __len__(self):
+        return len(self._entries)
+
+class DatasetHandle:
+    """Référence d'une session vers un jeu de données du registre.
+
+    La référence est rendue au registre par release() ou, à défaut, quand la poignée est collectée
+    (fin de session). Le finaliseur ne prend aucun verrou : il peut s'exécuter pendant un ramasse-miettes
+    déclenché par un thread qui détient déjà celui du registre. Il dépose seulement la clé dans une file,
+    vidée au prochain appel du registre.
+    """
+
+    def __init__(self, registry, key, dataset):
+        self.key = key
+        self.dataset = dataset
+        self._registry = registry
+        self._finalizer = weakref.finalize(self, registry._released.put, key)
+
+    def release(self):
+        """Rend la référence au registre (sans effet si elle a déjà été rendue)."""
+        self._finalizer()
+        self._registry.collect_releases()
+
+class DatasetRegistry:
+    """Jeux de données indexés par clé de contenu, comptés par référence et évincés par LRU sous budget mémoire.
+
+    Un jeu de données non référencé depuis plus de `ttl_seconds` est évincé même si le budget est respecté.
+    """
+
+    def __init__(self, memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES, ttl_seconds=DEFAULT_DATASET_TTL_SECONDS):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # Clés des poignées rendues, en attente de décompte (file réentrante, voir DatasetHandle)
+        self._released = queue.SimpleQueue()
+        self._build_locks = {}
+        self._entries = OrderedDict()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def acquire(self, key, build):
+        """Retourne une poignée vers le jeu de données `key`, construit par `build()` s'il est absent.
+
+        Plusieurs sessions demandant la même clé en même temps n'entraînent qu'une construction.
+        Succès et échecs sont comptés dans les mesures, phase 'registry_acquire_<type de jeu de données>'.
+        """
+        with measure_phase(f'registry_acquire_{key[0]}'):
+            return self._acquire(key, build)
+
+    def _acquire(self, key, build):
+        phase = f'registry_acquire_{key[0]}'
+        with self._lock:
+            self._apply_releases()
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    record_cache_lookup(phase, hit=True)
+                    entry['refs'] += 1
+                    entry['last_used'] = time.monotonic()
+                    self._entries.move_to_end(key)
+                    return DatasetHandle(self, key, entry['dataset'])
+            dataset = build()
+            nbytes = estimate_nbytes(dataset)
+            with self._lock:
+                self.misses += 1
+                record_cache_lookup(phase, hit=False)
+                self._entries[key] = {'dataset': dataset, 'nbytes': nbytes, 'refs': 1, 'last_used': time.monotonic()}
+                self._build_locks.pop(key, None)
+                self._evict()
+                return DatasetHandle(self, key, dataset)
+
+    def acquire_async(self, key, build):
+        """Lance acquire(key, build) dans un thread du registre ; retourne un Future de la poignée."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=INGESTION_MAX_WORKERS,
+                                                    thread_name_prefix='dataset-ingestion')
+        return self._executor.submit(self.acquire, key, build)
+
+    def collect_releases(self):
+        """Décompte les références rendues par les poignées libérées depuis le dernier appel."""
+        with self._lock:
+            self._apply_releases()
+
+    def _apply_releases(self):
+        """Décompte les clés déposées par les finaliseurs (verrou du registre détenu), puis évince si besoin."""
+        released = False
+        while True:
+            try:
+                key = self._released.get_nowait()
+            except queue.Empty:
+                break
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['refs'] = max(entry['refs'] - 1, 0)
+                entry['last_used'] = time.monotonic()
+                released = True
+        if released:
+            self._evict()
+
+    @staticmethod
+    def _entry_nbytes(entry):
+        return entry['nbytes'] + entry['dataset'].get('derived_nbytes', 0)
+
+    def _evict(self):
+        """Évince les entrées non référencées expirées, puis les moins récemment utilisées jusqu'au budget."""
+        if self.ttl_seconds is not None:
+            deadline = time.monotonic() - self.ttl_seconds
+            for key, entry in list(self._entries.items()):
+                if entry['refs'] == 0 and entry['last_used'] < deadline:
+                    del self._entries[key]
+                    self.expirations += 1
+        total = sum(self._entry_nbytes(entry) for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.memory_budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry['refs'] == 0:
+                total -= self._entry_nbytes(entry)
+                del self._entries[key]
+                self.evictions += 1
+
+    def stats(self):
+        """Retourne les compteurs du registre et l'état de chaque entrée."""
+        with self._lock:
+            self._apply_releases()
+            self._evict()
+            now = time.monotonic()
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(self._entry_nbytes(entry) for entry in self._entries.values()),
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'datasets': [{'key': '/'.join(map(str, key)), 'bytes': self._entry_nbytes(entry), 'refs': entry['refs'],
+                              'idle_seconds': round(now - entry['last_used'])}
+                             for key, entry in self._entries.items()],
+            }
+
+def build_rop_indexes(df, row_hashes, schema):
+    """Construit les index d'un ROP compacté (boîtes, segments de route, recherche inverse, noms de boîtes)."""
+    with measure_phase('build_boite_index'):
+        boite_index = build_boite_index(df, schema=schema)
+    with measure_phase('build_route_segment_table'):
+        route_segments = build_route_segment_table(df)
+    with measure_phase('build_reverse_index'):
+        reverse_index = build_reverse_index(route_segments)
+    with measure_phase('extract_boite_names_from_rop_df'):
+        boite_names = extract_boite_names_from_rop_df(df, schema)
+    return {
+        'row_hashes': row_hashes,
+        'boite_index': boite_index,
+        'route_segments': route_segments,
+        'reverse_index': reverse_index,
+        'boite_names': boite_names,
+    }
+
+def build_rop_dataset(data, previous=None, progress=None):
+    """Parse un fichier ROP et construit ses index, ou les relit depuis le disque s'ils y sont déjà.
+
+    Si `previous` (jeu de données d'une version antérieure du même fichier) est fourni, les index
+    sont dérivés des siens en ne traitant que les lignes ajoutées ou supprimées. `progress` reçoit
+    l'avancement (0 à 1) à la fin de chaque étape. La carte des colonnes (resolve_rop_schema) est
+    établie une fois et conservée dans le jeu de données ('schema').
+    """
+    digest = content_hash(data)
+    with measure_phase('read_excel_rop'):
+        df = read_excel_cached(data, header=None)
+    if progress:
+        progress(0.5)
+    with measure_phase('compact_rop_df'):
+        df = compact_rop_df(df)
+    schema = resolve_rop_schema(df)
+    if progress:
+        progress(0.6)
+    with measure_phase('load_rop_indexes'):
+        indexes = load_rop_indexes(digest)
+    if indexes is None:
+        with measure_phase('hash_rows'):
+            row_hashes = hash_rows(df)
+        if previous is not None:
+            with measure_phase('update_rop_indexes'):
+                indexes = update_rop_indexes(previous, df, row_hashes, schema)
+        if indexes is None:
+            indexes = build_rop_indexes(df, row_hashes, schema)
+        save_rop_indexes(digest, indexes)
+    if progress:
+        progress(1.0)
+    return {'digest': digest, 'df': df, 'schema': schema, **indexes}
+
+def build_stban_dataset(data, file_name, progress=None, previous=None):
+    """Parse un fichier STBAN et calcule le nombre de prises de toutes ses boîtes (relu depuis le disque si possible).
+
+    Si `previous` est fourni, seules les lignes ajoutées ou supprimées depuis cette version sont recomptées.
+    """
+    digest = content_hash(data)
+    with measure_phase('read_excel_stban'):
+        df = read_stban_cached(data, file_name, progress=progress)
+    with measure_phase('load_stban_indexes'):
+        indexes = load_stban_indexes(digest)
+    if indexes is None:
+        with measure_phase('hash_rows'):
+            row_hashes = hash_rows(df)
+        prises_components = None
+        if previous is not None:
+            with measure_phase('update_prises_components'):
+                prises_components = update_prises_components(previous, df, row_hashes)
+        if prises_components is None:
+            with measure_phase('build_prises_components'):
+                prises_components = build_prises_components(df)
+        with measure_phase('extract_stban_boite_names_from_df'):
+            boite_names = extract_stban_boite_names_from_df(df)
+        indexes = {'row_hashes': row_hashes, 'prises_components': prises_components, 'boite_names': boite_names}
+        save_stban_indexes(digest, indexes)
+    prises_table = prises_from_components(indexes['prises_components']) if indexes['prises_components'] is not None else None
+    return {'digest': digest, 'df': df, **indexes, 'prises_table': prises_table}
+
+def get_fiber_graph(rop_dataset):
+    """Retourne le graphe du réseau fibre d'un jeu de données ROP, construit à la première demande puis partagé."""
+    def build():
+        with measure_phase('build_fiber_graph'):
+            return build_fiber_graph(rop_dataset['df'], rop_dataset['route_segments'], rop_dataset['schema'])
+
+    return attach_derived(rop_dataset, 'fiber_graph', build)
+
+def get_route_html_cache(rop_dataset):
+    """Retourne le cache des routes rendues en HTML d'un jeu de données ROP, partagé par les sessions."""
+    return attach_derived(rop_dataset, 'route_html', lambda: DerivedCache(rop_dataset, ROUTE_HTML_CACHE_SIZE))
+
+def get_fulltext_index(rop_dataset):
+    """Retourne l'index plein texte d'un jeu de données ROP, relu du disque ou construit à la première demande."""
+    def build():
+        with measure_phase('load_fulltext_index'):
+            fulltext_index = load_fulltext_index(rop_dataset['digest'])
+        if fulltext_index is None:
+            with measure_phase('build_fulltext_index'):
+                fulltext_index = build_fulltext_index(rop_dataset['df'])
+            save_fulltext_index(rop_dataset['digest'], fulltext_index)
+        return fulltext_index
+
+    return attach_derived(rop_dataset, 'fulltext_index', build)
+
+def build_boite_names_dataset(rop_dataset, stban_dataset=None, progress=None):
+    """Fusionne les noms de boîtes du ROP et du STBAN et construit leurs index d'autocomplétion et de recherche approchée.
+
+    `progress` reçoit l'avancement (0 à 1) à la fin de chaque index.
+    """
+    digest = f"{rop_dataset['digest']}-{stban_dataset['digest'] if stban_dataset is not None else 'none'}"
+    with measure_phase('load_boite_search_index'):
+        search_index = load_boite_search_index(digest)
+    if search_index is None:
+        boite_names = set(rop_dataset['boite_names'])
+        if stban_dataset is not None:
+            boite_names.update(stban_dataset['boite_names'])
+        with measure_phase('build_boite_search_index'):
+            search_index = build_boite_search_index(sorted(boite_names))
+        save_boite_search_index(digest, search_index)
+    if progress:
+        progress(0.4)
+    with measure_phase('load_fuzzy_index'):
+        fuzzy_index = load_fuzzy_index(digest)
+    if fuzzy_index is None or fuzzy_index['max_distance'] != FUZZY_MAX_DISTANCE:
+        with measure_phase('build_fuzzy_index'):
+            fuzzy_index = build_fuzzy_index(search_index['lowered'], FUZZY_MAX_DISTANCE)
+        save_fuzzy_index(digest, fuzzy_index)
+    if progress:
+        progress(1.0)
+    return {'boite_names': search_index['names'], 'search_index': search_index, 'fuzzy_index': fuzzy_index}
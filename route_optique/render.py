@@ -0,0 +1,80 @@
+"""Rendu HTML des routes : une route complète produit un seul bloc HTML."""
+from html import escape
+
+from .rop import get_base_id, get_pbo_tube_fiber, get_route_segments, get_tiroir_pos
+
+def get_status_class(text):
+    """Retourne la classe CSS appropriée en fonction du statut."""
+    text_lower = str(text).lower()
+    if 'epissure' in text_lower:
+        return 'status-epissuree'
+    if 'passage' in text_lower:
+        return 'status-en-passage'
+    if 'stockee' in text_lower:
+        return 'status-stockee'
+    if 'ok' in text_lower:
+        return 'status-ok'
+    if 'nok' in text_lower:
+        return 'status-nok'
+    return ''
+
+def get_color_from_text(text):
+    """Assigne une couleur basée sur le texte (TUBE, FIBRE)."""
+    text = str(text).upper()
+    if text.startswith('T'):
+        return '#3b82f6'  # Blue
+    elif text.startswith('F'):
+        return '#10b981'  # Green
+    return '#64748b'  # Gray
+
+def render_segment_html(segment):
+    """Retourne le HTML condensé d'un segment de route (badges colorés), ou '' pour Tiroir/Position."""
+    if segment.type == 'cable':
+        details = segment.details.split(', ') if segment.details else []
+        elements_html = f'<div class="cable-name-condensed">{escape(segment.name)} ({segment.segment_length_ml}ml)</div>'
+        status_html = ''
+        elements_group = ''
+
+        for part in details:
+            status_class = get_status_class(part)
+            if status_class:
+                status_html += f'<div class="{status_class}">{escape(part)}</div>'
+            else:
+                color = get_color_from_text(part)
+                badge_class = 'boite-badge-condensed' if 'BPE' in part or 'CAS' in part else 'tube-badge-condensed'
+                elements_group += f'<span class="{badge_class}" style="background-color: {color}20; color: {color}; border-color: {color};">{escape(part)}</span>'
+
+        if elements_group:
+            elements_html += f'<div class="elements-group">{elements_group}</div>'
+        return f'<div class="segment-condensed fade-in">{elements_html}{status_html}</div>'
+
+    # Les points Tiroir et Position sont affichés dans l'en-tête de la route
+    if 'Tiroir' in segment.name or 'Position' in segment.name:
+        return ''
+    return f'<div class="segment-condensed fade-in"><span class="boite-badge-condensed">{escape(segment.name)}</span></div>'
+
+def render_metric_html(label, value):
+    """Retourne le HTML d'une carte métrique (Tiroir, Position)."""
+    return (f'<div class="metric-container"><div class="metric-label">{label}</div>'
+            f'<div class="metric-value">{escape(value.split(":")[-1].strip())}</div></div>')
+
+def render_route_html(row, rop_df, segment_table):
+    """Retourne la route détaillée d'une ligne ROP sous forme d'un unique bloc HTML."""
+    tiroir, pos = get_tiroir_pos(row, rop_df)
+    pbo_tube, pbo_fiber = get_pbo_tube_fiber(row, rop_df) # Cette fonction est un placeholder, à adapter si nécessaire
+    base_id = get_base_id(row)
+
+    parts = []
+    if base_id:
+        parts.append(f'<h3>ROP pour <span class="search-term-highlight">{escape(base_id)}</span></h3>')
+    metrics = [render_metric_html(label, value) for label, value in (('Tiroir', tiroir), ('Position', pos)) if value]
+    if metrics:
+        parts.append(f'<div class="route-metrics">{"".join(metrics)}</div>')
+    parts.append('<h4>🗺️ Route Détaillée</h4>')
+
+    segments = get_route_segments(segment_table, row.name)
+    if not segments.empty:
+        parts.extend(render_segment_html(segment) for segment in segments.itertuples(index=False))
+    else:
+        parts.append('<div class="route-empty">ℹ️ Pas de détails de route disponibles</div>')
+    return ''.join(parts)
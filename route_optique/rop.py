@@ -0,0 +1,235 @@
+"""Index et extraction des données du fichier Route Optique (ROP), lu sans en-tête."""
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Au-delà de cette proportion de valeurs distinctes (identifiants, cellules de route), une colonne reste en objets
+COMPACT_MAX_UNIQUE_RATIO = 0.5
+
+ROP_SUMMARY_COLUMNS = ['ROP', 'Identifiant', 'Tiroir', 'Position', 'Longueur totale (ml)']
+
+# Rôle des colonnes du ROP, reconnu au début du libellé d'en-tête (en minuscules, sans accents)
+ROP_COLUMN_ROLES = {
+    'boite': ('boite',),
+    'statut': ('statut', 'status'),
+    'route': ('route', 'cable'),
+    'extremite': ('extremi',),
+    'tiroir': ('tiroir',),
+    'position': ('position',),
+}
+# Statut des lignes retenues par la recherche par boîte
+ROP_SEARCH_STATUS = 'STOCKEE'
+
+def compact_rop_df(df):
+    """Encode les colonnes texte répétitives du ROP en catégories partageant une même table de chaînes.
+
+    Statuts, boîtes, tiroirs ou extrémités se répètent énormément : chaque cellule devient un code
+    entier et chaque chaîne distincte n'est stockée qu'une fois pour tout le fichier. Les comparaisons
+    d'égalité portent alors sur les codes.
+    """
+    uniques = {}
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col].dtype):
+            col_uniques = df[col].dropna().unique()
+            if len(col_uniques) <= COMPACT_MAX_UNIQUE_RATIO * max(df[col].count(), 1):
+                uniques[col] = col_uniques
+    if not uniques:
+        return df
+    string_table = pd.Index(pd.unique(np.concatenate(list(uniques.values()))), dtype=object)
+    dtype = pd.CategoricalDtype(categories=string_table)
+    return df.astype({col: dtype for col in uniques})
+
+def normalize_header_label(label):
+    """Normalise un libellé d'en-tête pour la reconnaissance des rôles : minuscules, sans accents ni espaces autour."""
+    return unicodedata.normalize('NFKD', str(label)).encode('ascii', 'ignore').decode().lower().strip()
+
+def resolve_rop_schema(df):
+    """Classe chaque colonne du ROP d'après la première ligne, qui porte les libellés ; retourne la carte rôle -> colonnes.
+
+    La carte contient aussi 'boite_statut', les couples (colonne Boîte, colonne Statut) de chaque
+    groupe : le statut d'une boîte est la première colonne 'Statut' qui la suit avant la boîte
+    suivante ou, si l'en-tête n'en nomme aucune, la colonne située 3 colonnes plus loin.
+    """
+    schema = {role: [] for role in ROP_COLUMN_ROLES}
+    labels = df.iloc[0].tolist() if len(df) else [None] * df.shape[1]
+    for col_idx, label in enumerate(labels):
+        if pd.isna(label):
+            continue
+        label = normalize_header_label(label)
+        for role, prefixes in ROP_COLUMN_ROLES.items():
+            if label.startswith(prefixes):
+                schema[role].append(col_idx)
+                break
+
+    boite_statut = []
+    bounds = schema['boite'][1:] + [df.shape[1]]
+    for boite_col, next_boite_col in zip(schema['boite'], bounds):
+        statut_cols = [col for col in schema['statut'] if boite_col < col < next_boite_col]
+        if statut_cols:
+            boite_statut.append((boite_col, statut_cols[0]))
+        elif not schema['statut'] and boite_col + 3 < df.shape[1]:
+            boite_statut.append((boite_col, boite_col + 3))
+    schema['boite_statut'] = boite_statut
+    return schema
+
+def find_rop_boite_columns(df, schema=None):
+    """Retourne les indices des colonnes 'Boîte' du ROP (d'après la première ligne, qui porte les libellés)."""
+    return (schema or resolve_rop_schema(df))['boite']
+
+def extract_boite_names_from_rop_df(df, schema=None):
+    """Extrait les noms de boîtes uniques des colonnes 'Boîte' du DataFrame ROP."""
+    boite_names = set()
+    for col_idx in find_rop_boite_columns(df, schema):
+        # Extraire les valeurs de cette colonne (en ignorant l'en-tête)
+        unique_vals = df.iloc[1:, col_idx].dropna().astype(str).unique()
+        boite_names.update([val.strip() for val in unique_vals if val.strip()])
+    return sorted(list(boite_names))
+
+def build_boite_index(df, values=None, schema=None):
+    """Construit l'index inversé boîte -> lignes ROP (triées) au statut 'STOCKEE'.
+
+    Tous les couples (Boîte, Statut) de la carte des colonnes sont filtrés à la fois : une ligne
+    est retenue pour une boîte dès que l'un de ses groupes la cite avec ce statut. Si `values`
+    est fourni, seules ces valeurs sont indexées.
+    """
+    pairs = (schema or resolve_rop_schema(df))['boite_statut']
+    if not pairs:
+        return {}
+    boite_cols, statut_cols = zip(*pairs)
+    boites = df.iloc[:, list(boite_cols)].to_numpy(dtype=object)
+    selected = (df.iloc[:, list(statut_cols)] == ROP_SEARCH_STATUS).to_numpy() & pd.notna(boites)
+    selected[:1] = False
+    if values is not None:
+        selected &= pd.Series(boites.ravel()).isin(values).to_numpy().reshape(boites.shape)
+    rows, _ = np.nonzero(selected)
+
+    # Paires (boîte, ligne) dédoublonnées et triées par clé entière code * n + ligne, puis découpées par boîte
+    codes, uniques = pd.factorize(boites[selected])
+    n_rows = max(len(df), 1)
+    keys = np.sort(codes.astype(np.int64) * n_rows + rows)
+    keys = keys[np.diff(keys, prepend=-1) != 0]
+    bounds = np.searchsorted(keys // n_rows, np.arange(len(uniques) + 1))
+    positions = (keys % n_rows).astype(np.intp)
+    return {value: positions[start:stop] for value, start, stop in zip(uniques.tolist(), bounds[:-1], bounds[1:])}
+
+def search_rop_rows(df, boite_index, search_term):
+    """Retourne les lignes ROP 'STOCKEE' d'une boîte à partir de l'index inversé."""
+    rows = boite_index.get(search_term)
+    if rows is None:
+        return pd.DataFrame()
+    return df.iloc[rows]
+
+def get_tiroir_pos(row, rop_df):
+    """Extrait le tiroir et la position d'une ligne de ROP."""
+    tiroir = None
+    pos = None
+    for i, val in enumerate(row):
+        if pd.isna(val): continue
+        val_str = str(val).strip()
+        if "TIROIR" in val_str.upper():
+            tiroir = val_str
+        if "POSITION" in val_str.upper():
+            pos = val_str
+    return tiroir, pos
+
+def get_base_id(row):
+    """Retourne le base_id d'une ligne de ROP (première valeur non vide qui n'est ni Tiroir ni Position)."""
+    for item in row:
+        if pd.isna(item): continue
+        item_str = str(item)
+        if "TIROIR" not in item_str.upper() and "POSITION" not in item_str.upper():
+            return item_str
+    return None
+
+def strip_label(values):
+    """Retire le libellé des valeurs 'Libellé: valeur' (texte après le dernier ':'), None conservés."""
+    stripped = pd.Series(values, dtype=str).str.replace(r'(?s)^.*:', '', regex=True).str.strip()
+    return stripped.astype(object).where(stripped.notna(), None).to_numpy()
+
+def summarize_rop_rows(df, segment_table, rows):
+    """Résume des lignes ROP (une par position de `rows`) : numéro, identifiant, tiroir, position, longueur totale.
+
+    Mêmes règles que get_base_id et get_tiroir_pos, appliquées colonne par colonne à toutes les
+    lignes à la fois (sur les valeurs distinctes de chaque colonne).
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    block = df.iloc[rows]
+    base_ids = np.full(len(rows), None, dtype=object)
+    tiroirs = np.full(len(rows), None, dtype=object)
+    positions = np.full(len(rows), None, dtype=object)
+    for col_idx in range(block.shape[1]):
+        codes, uniques = pd.factorize(block.iloc[:, col_idx])
+        present = codes >= 0
+        if not present.any():
+            continue
+        text = pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+        upper = text.str.upper()
+        has_tiroir = present & upper.str.contains('TIROIR', regex=False).to_numpy()[codes]
+        has_position = present & upper.str.contains('POSITION', regex=False).to_numpy()[codes]
+        stripped = text.str.strip().to_numpy(dtype=object)[codes]
+        tiroirs[has_tiroir] = stripped[has_tiroir]
+        positions[has_position] = stripped[has_position]
+        is_base_id = present & ~has_tiroir & ~has_position & pd.isna(base_ids)
+        base_ids[is_base_id] = text.to_numpy(dtype=object)[codes][is_base_id]
+
+    route_rows = segment_table[segment_table['row'].isin(rows)]
+    total_lengths = route_rows.groupby('row')['cumulative_length_ml'].max()
+    summary = pd.DataFrame({
+        'ROP': rows + 1,
+        'Identifiant': base_ids,
+        'Tiroir': strip_label(tiroirs),
+        'Position': strip_label(positions),
+        'Longueur totale (ml)': total_lengths.reindex(rows).to_numpy(),
+    }, columns=ROP_SUMMARY_COLUMNS, index=rows)
+    summary['ROP'] = summary['ROP'].astype('Int64')
+    summary['Longueur totale (ml)'] = summary['Longueur totale (ml)'].astype('Int64')
+    return summary
+
+def get_pbo_tube_fiber(row, rop_df):
+    """Extrait les informations PBO, tube et fibre d'une ligne de ROP."""
+    pbo_tube = None
+    pbo_fiber = None
+    # Cette fonction est un placeholder, à adapter selon la structure réelle de vos données
+    # Par exemple, si PBO_TUBE et PBO_FIBRE sont des colonnes spécifiques
+    # Ou si elles sont extraites de manière plus complexe à partir de la ligne
+    return pbo_tube, pbo_fiber
+
+# Ex: TE2-CA-0000101_72F0 / 10ml (10ml), T1, F3 -> nom du câble, longueur du segment, longueur cumulée, détails
+ROUTE_CABLE_PATTERN = r'^([A-Z0-9\-]+_\d+F\d*)\s*/\s*(\d+)ml\s*\((\d+)ml\)(.*)$'
+
+def build_route_segment_table(df):
+    """Parse en une seule passe toutes les cellules de route du ROP en une table de segments.
+
+    Une ligne par cellule non vide, dans l'ordre des colonnes : câble (longueurs en ml entières
+    et détails) ou point de passage (boîte, tiroir, position, etc.), avec la colonne d'origine.
+    """
+    values = df.to_numpy(dtype=object)
+    filled = pd.notna(values)
+    rows, cols = np.nonzero(filled)
+    cells = pd.Series(values[filled], dtype=object).astype(str).str.strip()
+    keep = (cells != '').to_numpy()
+    rows, cols, cells = rows[keep], cols[keep], cells[keep].reset_index(drop=True)
+
+    extracted = cells.str.extract(ROUTE_CABLE_PATTERN, flags=re.DOTALL)
+    is_cable = extracted[0].notna()
+    details = (extracted[3].fillna('')
+               .str.replace(r'\s*(?:,\s*)+', ', ', regex=True)
+               .str.strip(', '))
+    return pd.DataFrame({
+        'row': rows,
+        'order': pd.Series(rows).groupby(rows).cumcount().to_numpy(),
+        'col': cols,
+        'type': np.where(is_cable, 'cable', 'point'),
+        'name': extracted[0].where(is_cable, cells),
+        'segment_length_ml': pd.to_numeric(extracted[1]).astype('Int64'),
+        'cumulative_length_ml': pd.to_numeric(extracted[2]).astype('Int64'),
+        'details': details,
+    })
+
+def get_route_segments(segment_table, row_id):
+    """Retourne les segments d'une ligne ROP (tranche de la table triée par ligne)."""
+    start, stop = np.searchsorted(segment_table['row'].to_numpy(), [row_id, row_id + 1])
+    return segment_table.iloc[start:stop]
+
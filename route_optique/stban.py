@@ -0,0 +1,89 @@
+"""Colonnes du fichier STBAN et calcul du nombre de prises par boîte."""
+import numpy as np
+import pandas as pd
+
+STBAN_BOITE_COLUMN_NAMES = ['boite', 'boîte', 'Boite', 'Boîte', 'BOITE', 'BOÎTE', 'box', 'Box']
+
+def find_stban_boite_column(columns_list):
+    """Retourne la première colonne STBAN dont le nom désigne une boîte."""
+    for col in columns_list:
+        col_lower = col.lower().strip()
+        if any(boite_name.lower() in col_lower for boite_name in STBAN_BOITE_COLUMN_NAMES):
+            return col
+    return None
+
+def extract_stban_boite_names_from_df(df):
+    """Extrait tous les noms de boîtes uniques depuis le DataFrame STBAN."""
+    boite_col = find_stban_boite_column(df.columns)
+    if boite_col is None:
+        return []
+    unique_vals = df[boite_col].dropna().astype(str).unique()
+    return sorted(set(val.strip() for val in unique_vals if val.strip()))
+
+def identify_columns(columns_list):
+    """Identifie les colonnes PRISE et PTO une seule fois."""
+    prise_col, pto_col = None, None
+    for col in columns_list:
+        col_upper = col.upper()
+        if not prise_col and 'REF_PBO_PRISE' in col_upper:
+            prise_col = col
+        elif not pto_col and 'REF_PBO_PTO' in col_upper:
+            pto_col = col
+        if prise_col and pto_col:
+            break
+    return prise_col, pto_col
+
+def resolve_stban_columns(columns_list):
+    """Retourne, sans doublon, les colonnes du STBAN réellement utilisées (PRISE, PTO, boîte)."""
+    prise_col, pto_col = identify_columns(list(columns_list))
+    boite_col = find_stban_boite_column(columns_list)
+    return [col for col in dict.fromkeys((prise_col, pto_col, boite_col)) if col]
+
+def prepare_stban_for_search(stban_df, prise_col, pto_col):
+    """Prépare le DataFrame STBAN une seule fois avec les colonnes en majuscules."""
+    if stban_df is None or not prise_col or not pto_col:
+        return None
+    return pd.DataFrame({
+        'PRISE_UPPER': stban_df[prise_col].fillna('').astype(str).str.strip().str.upper(),
+        'PTO_UPPER': stban_df[pto_col].fillna('').astype(str).str.strip().str.upper()
+    })
+
+def build_prises_components(stban_df):
+    """Compte par boîte les prises en PRISE, celles en PTO seul et celles dont le PTO désigne une autre boîte."""
+    if stban_df is None:
+        return None
+    prise_col, pto_col = identify_columns(list(stban_df.columns))
+    optimized_df = prepare_stban_for_search(stban_df, prise_col, pto_col)
+    if optimized_df is None:
+        return None
+    prise = optimized_df['PRISE_UPPER']
+    pto = optimized_df['PTO_UPPER']
+    pto_differs = pto != prise
+    return pd.DataFrame({
+        'prise': prise.value_counts(),
+        'pto_only': pto[pto_differs].value_counts(),
+        'prise_autre_pto': prise[pto_differs & (pto != '')].value_counts(),
+    }).fillna(0).astype(int)
+
+def prises_from_components(counts):
+    """Déduit le nombre de prises de chaque boîte de ses composantes (voir build_prises_components)."""
+    prises = np.maximum(counts['prise'], counts['prise'] + counts['pto_only'] - counts['prise_autre_pto'])
+    return prises.rename('Nombre de prises').rename_axis('Boîte')
+
+def build_prises_count_table(stban_df):
+    """Calcule en une seule passe le nombre de prises de toutes les boîtes du STBAN.
+
+    Pour chaque boîte : prises référencées en PRISE, plus celles référencées uniquement en PTO,
+    moins les prises dont le PTO désigne une autre boîte (jamais moins que le nombre en PRISE).
+    """
+    counts = build_prises_components(stban_df)
+    if counts is None:
+        return None
+    return prises_from_components(counts)
+
+def calculate_prises_count(prises_table, boite_name):
+    """Fonction principale pour calculer le nombre de prises pour une boîte."""
+    if prises_table is None or not boite_name:
+        return None
+    return int(prises_table.get(str(boite_name).strip().upper(), 0))
+
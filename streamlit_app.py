@@ -1,11 +1,22 @@
 
 # app_final_v3.py - Application Route Optique avec Streamlit - Version complète et stylisée
 import streamlit as st
-import pandas as pd
-import numpy as np
-from io import BytesIO
 import base64
-import re
+from html import escape
+import logging
+import os
+import time
+
+import route_optique
+from route_optique import (
+    BOITE_SUGGESTIONS_LIMIT,
+    batch_report_to_excel,
+    current_rss_bytes,
+    instrument_phase,
+    parse_batch_boite_names,
+    phase_stats,
+    write_prometheus,
+)
 
 # Configuration de la page
 st.set_page_config(
@@ -517,6 +528,23 @@ div[data-baseweb="radio"] input:checked + div {
 }
 
 /* Style pour chaque étape de route */
+.route-metrics {
+    display: flex;
+    gap: 1rem;
+    margin-bottom: 1rem;
+}
+
+.route-metrics .metric-container {
+    flex: 1;
+}
+
+.route-empty {
+    background: #eff6ff;
+    color: #1e40af;
+    padding: 0.75rem 1rem;
+    border-radius: var(--radius-md);
+}
+
 .route-step-card {
     background-color: var(--background-white);
     border-radius: var(--radius-md);
@@ -532,249 +560,125 @@ div[data-baseweb="radio"] input:checked + div {
 st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
 
 # --- Fonctions de Traitement des Données (Mises en Cache) ---
-
-@st.cache_data
-def get_all_unique_values(df):
-    """Extrait toutes les valeurs uniques du DataFrame pour l'autocomplétion."""
-    all_values = set()
-    for col in df.columns:
-        unique_vals = df[col].dropna().astype(str).unique()
-        all_values.update(unique_vals)
-    return sorted([val for val in all_values if val.strip() != ''])
-
-@st.cache_data
-def extract_boite_names_from_rop_df(df):
-    """Extrait les noms de boîtes uniques des colonnes 'Boîte' du DataFrame ROP."""
-    boite_names = set()
-    boite_column_names = ['boite', 'boîte', 'Boite', 'Boîte', 'BOITE', 'BOÎTE'] # Noms de colonnes à rechercher
-    for col_idx in range(df.shape[1]): # Itérer sur les indices de colonnes
-        # Vérifier si la première cellule de la colonne correspond à un nom de boîte
-        if pd.notna(df.iloc[0, col_idx]) and str(df.iloc[0, col_idx]).lower().strip() in boite_column_names:
-            # Extraire les valeurs de cette colonne (en ignorant l'en-tête)
-            unique_vals = df.iloc[1:, col_idx].dropna().astype(str).unique()
-            boite_names.update([val.strip() for val in unique_vals if val.strip()])
-    return sorted(list(boite_names))
-
-@st.cache_data
-def extract_stban_boite_names_from_df(df):
-    """Extrait tous les noms de boîtes uniques depuis le DataFrame STBAN."""
-    boite_names = set()
-    boite_column_names = ['boite', 'boîte', 'Boite', 'Boîte', 'BOITE', 'BOÎTE', 'box', 'Box']
-    for col in df.columns:
-        col_lower = col.lower().strip()
-        if any(boite_name.lower() in col_lower for boite_name in boite_column_names):
-            unique_vals = df[col].dropna().astype(str).unique()
-            boite_names.update([val.strip() for val in unique_vals if val.strip()])
-            break
-    return sorted(list(boite_names))
-
-@st.cache_data
-def identify_columns(columns_list):
-    """Identifie les colonnes PRISE et PTO une seule fois."""
-    prise_col, pto_col = None, None
-    for col in columns_list:
-        col_upper = col.upper()
-        if not prise_col and 'REF_PBO_PRISE' in col_upper:
-            prise_col = col
-        elif not pto_col and 'REF_PBO_PTO' in col_upper:
-            pto_col = col
-        if prise_col and pto_col:
-            break
-    return prise_col, pto_col
-
-@st.cache_data
-def prepare_stban_for_search(_stban_df, prise_col, pto_col):
-    """Prépare le DataFrame STBAN une seule fois avec les colonnes en majuscules."""
-    if _stban_df is None or not prise_col or not pto_col:
-        return None
-    return pd.DataFrame({
-        'PRISE_UPPER': _stban_df[prise_col].fillna('').astype(str).str.strip().str.upper(),
-        'PTO_UPPER': _stban_df[pto_col].fillna('').astype(str).str.strip().str.upper()
-    })
-
-@st.cache_data
-def calculate_prises_count_optimized(_optimized_df, boite_name):
-    """Version optimisée du calcul des prises avec DataFrame pré-traité."""
-    if _optimized_df is None or not boite_name:
-        return None
-    boite_name_clean = str(boite_name).strip().upper()
-    prise_array = _optimized_df['PRISE_UPPER'].values
-    pto_array = _optimized_df['PTO_UPPER'].values
-    is_prise = (prise_array == boite_name_clean)
-    is_pto = (pto_array == boite_name_clean)
-    pto_not_empty = (pto_array != '')
-    count_prise = np.sum(is_prise)
-    count_pto_only = np.sum(is_pto & ~is_prise)
-    count_prise_autre_pto = np.sum(is_prise & pto_not_empty & ~is_pto)
-    return max(int(count_prise), int(count_prise + count_pto_only - count_prise_autre_pto))
-
-def calculate_prises_count(stban_df, boite_name):
-    """Fonction principale pour calculer le nombre de prises pour une boîte."""
-    if stban_df is None or not boite_name:
-        return None
-    prise_col, pto_col = identify_columns(list(stban_df.columns))
-    if not prise_col or not pto_col:
-        st.warning("Colonnes 'REF_PBO_PRISE' ou 'REF_PBO_PTO' introuvables dans le fichier STBAN.")
-        return None
-    optimized_df = prepare_stban_for_search(stban_df, prise_col, pto_col)
-    return calculate_prises_count_optimized(optimized_df, boite_name)
+# Le moteur de données vit dans le paquet route_optique ; l'application n'ajoute que la mise en cache Streamlit.
+
+@st.cache_resource
+def get_dataset_registry():
+    """Registre des jeux de données parsés et indexés, partagé par toutes les sessions du serveur."""
+    budget_mb = int(os.environ.get('ROP_DATASET_BUDGET_MB', '2048'))
+    ttl_minutes = int(os.environ.get('ROP_DATASET_TTL_MINUTES', '120'))
+    return route_optique.DatasetRegistry(memory_budget_bytes=budget_mb * 1024 ** 2,
+                                         ttl_seconds=ttl_minutes * 60 if ttl_minutes > 0 else None)
+
+dataset_registry = get_dataset_registry()
+
+# Chaque phase coûteuse est mesurée (temps, appels, RSS) pour le panneau de debug.
+# Les phases de chargement et d'indexation sont mesurées par le registre lui-même.
+
+search_boite_names = instrument_phase('search_boite_names', route_optique.search_boite_names)
+search_rop_rows = instrument_phase('search_rop_rows', route_optique.search_rop_rows)
+calculate_prises_count = instrument_phase('calculate_prises_count', route_optique.calculate_prises_count)
+render_route_html = instrument_phase('render_route_html', route_optique.render_route_html)
+run_batch_query = instrument_phase('run_batch_query', route_optique.run_batch_query)
+downstream_nodes = instrument_phase('downstream_nodes', route_optique.downstream_nodes)
+routes_through = instrument_phase('routes_through', route_optique.routes_through)
+shortest_path = instrument_phase('shortest_path', route_optique.shortest_path)
+reverse_lookup = instrument_phase('reverse_lookup', route_optique.reverse_lookup)
+fulltext_search = instrument_phase('fulltext_search', route_optique.fulltext_search)
+fuzzy_search = instrument_phase('fuzzy_search', route_optique.fuzzy_search)
+run_federated_batch_query = instrument_phase('run_federated_batch_query', route_optique.run_federated_batch_query)
+route_export_file = instrument_phase('route_export_file', route_optique.route_export_file)
 
 # --- Fonctions d'Affichage ---
 
-def get_tiroir_pos(row, rop_df):
-    """Extrait le tiroir et la position d'une ligne de ROP."""
-    tiroir = None
-    pos = None
-    for i, val in enumerate(row):
-        if pd.isna(val): continue
-        val_str = str(val).strip()
-        if "TIROIR" in val_str.upper():
-            tiroir = val_str
-        if "POSITION" in val_str.upper():
-            pos = val_str
-    return tiroir, pos
-
-def get_pbo_tube_fiber(row, rop_df):
-    """Extrait les informations PBO, tube et fibre d'une ligne de ROP."""
-    pbo_tube = None
-    pbo_fiber = None
-    # Cette fonction est un placeholder, à adapter selon la structure réelle de vos données
-    # Par exemple, si PBO_TUBE et PBO_FIBRE sont des colonnes spécifiques
-    # Ou si elles sont extraites de manière plus complexe à partir de la ligne
-    return pbo_tube, pbo_fiber
-
-def get_status_class(text):
-    """Retourne la classe CSS appropriée en fonction du statut."""
-    text_lower = str(text).lower()
-    if 'epissure' in text_lower:
-        return 'status-epissuree'
-    if 'passage' in text_lower:
-        return 'status-en-passage'
-    if 'stockee' in text_lower:
-        return 'status-stockee'
-    if 'ok' in text_lower:
-        return 'status-ok'
-    if 'nok' in text_lower:
-        return 'status-nok'
-    return ''
-
-def get_color_from_text(text):
-    """Assigne une couleur basée sur le texte (TUBE, FIBRE)."""
-    text = str(text).upper()
-    if text.startswith('T'):
-        return '#3b82f6'  # Blue
-    elif text.startswith('F'):
-        return '#10b981'  # Green
-    return '#64748b'  # Gray
-
-@st.cache_data
-def extract_route_segments(row):
-    """Extrait les segments de route d'une ligne du DataFrame."""
-    segments = []
-    for item in row.dropna():
-        item_str = str(item).strip()
-        if not item_str: continue
-
-        # Regex pour capturer le nom du câble, la longueur du segment et la longueur cumulée
-        # Ex: TE2-CA-0000101_72F0 / 10ml (10ml)
-        cable_match = re.match(r'([A-Z0-9\-]+_\d+F\d*)\s*/\s*(\d+ml)\s*\((\d+ml)\)', item_str)
-        if cable_match:
-            cable_name, segment_length, cumulative_length = cable_match.groups()
-            remaining_text = item_str[cable_match.end():].strip()
-            parts = [p.strip() for p in remaining_text.split(',') if p.strip()]
-            segments.append({
-                'type': 'cable',
-                'name': cable_name,
-                'segment_length': segment_length,
-                'cumulative_length': cumulative_length,
-                'details': parts
-            })
-        else:
-            # Si ce n'est pas un câble, c'est un point de passage (boîte, tiroir, position, etc.)
-            segments.append({
-                'type': 'point',
-                'name': item_str
-            })
-    return segments
-
-@st.cache_data
-def calculate_cumulative_lengths(df):
-    """Calcule les longueurs cumulées pour chaque segment de route."""
-    # Cette fonction est un placeholder si le calcul est déjà fait dans le fichier.
-    # Si le fichier ROP ne contient pas de longueurs cumulées, cette fonction les calculerait.
-    # Pour l'instant, elle retourne le DataFrame tel quel, car les longueurs cumulées sont extraites directement.
-    return df
-
-def display_segment_condensed_with_colors(segment):
-    """Affiche un segment de route de manière condensée avec des badges colorés."""
-    if segment['type'] == 'cable':
-        cable_name = segment['name']
-        segment_length = segment['segment_length']
-        details = segment['details']
-
-        elements_html = f'<div class="cable-name-condensed">{cable_name} ({segment_length})</div>'
-        status_html = ''
-        elements_group = ''
-
-        for part in details:
-            status_class = get_status_class(part)
-            if status_class:
-                status_html += f'<div class="{status_class}">{part}</div>'
-            else:
-                color = get_color_from_text(part)
-                badge_class = 'boite-badge-condensed' if 'BPE' in part or 'CAS' in part else 'tube-badge-condensed'
-                elements_group += f'<span class="{badge_class}" style="background-color: {color}20; color: {color}; border-color: {color};">{part}</span>'
-        
-        if elements_group:
-            elements_html += f'<div class="elements-group">{elements_group}</div>'
-
-        st.markdown(f'<div class="segment-condensed fade-in">{elements_html}{status_html}</div>', unsafe_allow_html=True)
-
-    elif segment['type'] == 'point':
-        point_name = segment['name']
-        # Gérer l'affichage des points comme Tiroir, Position, etc.
-        if 'Tiroir' in point_name or 'Position' in point_name:
-            # Ces éléments sont gérés séparément dans display_detailed_route
-            pass
-        else:
-            # Pour les autres points, on peut les afficher comme un badge simple
-            st.markdown(f'<div class="segment-condensed fade-in"><span class="boite-badge-condensed">{point_name}</span></div>', unsafe_allow_html=True)
-
-def display_detailed_route(row, rop_df):
-    """Affiche la route détaillée pour une ligne de résultat, en utilisant les fonctions réintégrées."""
-    tiroir, pos = get_tiroir_pos(row, rop_df)
-    pbo_tube, pbo_fiber = get_pbo_tube_fiber(row, rop_df) # Cette fonction est un placeholder, à adapter si nécessaire
-
-    # Extraire le base_id (première valeur non-NaN de la ligne qui n'est ni Tiroir ni Position)
-    base_id = None
-    for item in row.dropna():
-        item_str = str(item)
-        if "TIROIR" not in item_str.upper() and "POSITION" not in item_str.upper():
-            base_id = item_str
-            break
-
-    if base_id:
-        st.markdown(f"<h3>ROP pour <span class=\"search-term-highlight\">{base_id}</span></h3>", unsafe_allow_html=True)
-
-    col1, col2 = st.columns(2)
-    with col1:
-        if tiroir:
-            st.markdown(f"<div class=\"metric-container\"><div class=\"metric-label\">Tiroir</div><div class=\"metric-value\">{tiroir.split(":")[-1].strip()}</div></div>", unsafe_allow_html=True)
-    with col2:
-        if pos:
-            st.markdown(f"<div class=\"metric-container\"><div class=\"metric-label\">Position</div><div class=\"metric-value\">{pos.split(":")[-1].strip()}</div></div>", unsafe_allow_html=True)
-    
-    st.markdown("<h4>🗺️ Route Détaillée</h4>", unsafe_allow_html=True)
-
-    segments = extract_route_segments(row)
-    if segments:
-        cumulative_lengths = calculate_cumulative_lengths(segments)
-        for i, segment in enumerate(segments):
-            cumul = cumulative_lengths[i] if i < len(cumulative_lengths) else None
-            display_segment_condensed_with_colors(segment)
-    else:
-        st.info("ℹ️ Pas de détails de route disponibles")
-
+# Intervalle de rafraîchissement de l'avancement des fichiers indexés en arrière-plan
+INGESTION_POLL_SECONDS = 0.5
+
+def display_detailed_route(row, rop_dataset):
+    """Affiche la route détaillée d'une ligne de résultat en un seul bloc HTML, mis en cache par ligne et par fichier."""
+    route_html_cache = route_optique.get_route_html_cache(rop_dataset)
+    route_html = route_html_cache.get(row.name)
+    if route_html is None:
+        route_html = render_route_html(row, rop_dataset['df'], rop_dataset['route_segments'])
+        route_html_cache.put(row.name, route_html)
+    st.markdown(route_html, unsafe_allow_html=True)
+
+def route_export_buttons(rop_dataset, prises_table, boite_names, file_stem, key):
+    """Boutons de téléchargement des routes détaillées d'une liste de boîtes (Excel, CSV), générées au clic."""
+    def export(file_format):
+        blocks = route_optique.iter_route_export(rop_dataset['df'], rop_dataset['boite_index'], prises_table,
+                                                 rop_dataset['route_segments'], boite_names)
+        return route_export_file(blocks, file_format)
+
+    export_col1, export_col2 = st.columns(2)
+    with export_col1:
+        st.download_button("⬇️ Routes détaillées (Excel)", lambda: export('xlsx'), file_name=f"{file_stem}.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                           key=f"{key}_xlsx", on_click="ignore")
+    with export_col2:
+        st.download_button("⬇️ Routes détaillées (CSV)", lambda: export('csv'), file_name=f"{file_stem}.csv",
+                           mime="text/csv", key=f"{key}_csv", on_click="ignore")
+
+def replace_handle(state_key, handle):
+    """Remplace la poignée de session `state_key` en rendant l'ancienne au registre."""
+    previous = st.session_state.get(state_key)
+    if previous is not None:
+        previous.release()
+    st.session_state[state_key] = handle
+
+def start_ingestion(state_key, key, build, *args, **kwargs):
+    """Lance en arrière-plan la construction `build(*args, progress=..., **kwargs)` du jeu de données `key`.
+
+    Les arguments sont liés ici : le thread ne doit pas relire les variables du script, réaffectées entre-temps.
+    """
+    progress = {'fraction': 0.0}
+    future = dataset_registry.acquire_async(
+        key, lambda: build(*args, progress=lambda fraction: progress.update(fraction=fraction), **kwargs))
+    st.session_state[state_key] = {'key': key, 'future': future, 'progress': progress, 'previous': kwargs.get('previous')}
+    st.session_state.ingestion_errors.pop(state_key, None)
+
+def collect_ingestion(state_key, handle_key, file_id_key=None, error_text=None):
+    """Installe la poignée d'une construction en arrière-plan terminée et retourne son état (None si elle est en cours).
+
+    Une construction en échec est notée dans `ingestion_errors` (clé du jeu de données, message) et,
+    si `error_text` est fourni, signalée par st.error ; le fichier éventuel (`file_id_key`) sera relu
+    au prochain chargement.
+    """
+    ingestion = st.session_state[state_key]
+    if ingestion is None or not ingestion['future'].done():
+        return None
+    st.session_state[state_key] = None
+    try:
+        replace_handle(handle_key, ingestion['future'].result())
+    except Exception as error:
+        logging.getLogger(__name__).exception("Échec de la construction du jeu de données %s", ingestion['key'])
+        if file_id_key is not None:
+            st.session_state[file_id_key] = None
+        st.session_state.ingestion_errors[state_key] = (ingestion['key'], str(error) or type(error).__name__)
+        if error_text is not None:
+            st.error(f"{error_text} : {st.session_state.ingestion_errors[state_key][1]}")
+        return None
+    return ingestion
+
+@st.fragment(run_every=INGESTION_POLL_SECONDS)
+def show_ingestion_progress(state_key, text):
+    """Affiche l'avancement d'une construction en arrière-plan et relance la page dès qu'elle est terminée."""
+    ingestion = st.session_state[state_key]
+    if ingestion is None or ingestion['future'].done():
+        st.rerun()
+    st.progress(ingestion['progress']['fraction'], text=text)
+
+def acquire_federated_source(rop_file, stban_file):
+    """Retourne les poignées {'label', 'rop', 'stban'} d'un couple ROP/STBAN de la recherche multi-fichiers."""
+    rop_data = rop_file.getvalue()
+    rop_handle = dataset_registry.acquire(route_optique.dataset_key('rop', route_optique.content_hash(rop_data)),
+                                          lambda: route_optique.build_rop_dataset(rop_data))
+    stban_handle = None
+    if stban_file is not None:
+        stban_data = stban_file.getvalue()
+        stban_handle = dataset_registry.acquire(route_optique.dataset_key('stban', route_optique.content_hash(stban_data)),
+                                                lambda: route_optique.build_stban_dataset(stban_data, stban_file.name))
+    return {'label': rop_file.name, 'rop': rop_handle, 'stban': stban_handle}
 
 # --- Interface Utilisateur (UI) ---
 
@@ -792,12 +696,24 @@ st.markdown(f'''
 </div>
 ''', unsafe_allow_html=True)
 
+# Tailles de page proposées pour la liste des ROP trouvées
+RESULTS_PAGE_SIZES = [10, 25, 50, 100]
+SEARCH_MODES = ["Boîte", "Câble / tube / fibre", "Tiroir / position", "Texte libre"]
+
 # Initialisation de l'état de session
-if 'route_optique_df' not in st.session_state: st.session_state.route_optique_df = None
-if 'stban_df' not in st.session_state: st.session_state.stban_df = None
-if 'all_unique_values' not in st.session_state: st.session_state.all_unique_values = []
-if 'boite_names' not in st.session_state: st.session_state.boite_names = []
-if 'stban_processed' not in st.session_state: st.session_state.stban_processed = False
+# La session ne conserve que des poignées vers les jeux de données du registre, partagés entre sessions
+if 'rop_handle' not in st.session_state: st.session_state.rop_handle = None
+if 'stban_handle' not in st.session_state: st.session_state.stban_handle = None
+if 'boites_handle' not in st.session_state: st.session_state.boites_handle = None
+if 'route_optique_file_id' not in st.session_state: st.session_state.route_optique_file_id = None
+if 'stban_file_id' not in st.session_state: st.session_state.stban_file_id = None
+if 'rop_diff_report' not in st.session_state: st.session_state.rop_diff_report = None
+if 'rop_ingestion' not in st.session_state: st.session_state.rop_ingestion = None
+if 'stban_ingestion' not in st.session_state: st.session_state.stban_ingestion = None
+if 'boites_ingestion' not in st.session_state: st.session_state.boites_ingestion = None
+if 'ingestion_errors' not in st.session_state: st.session_state.ingestion_errors = {}
+if 'federation_sources' not in st.session_state: st.session_state.federation_sources = []
+if 'federation_key' not in st.session_state: st.session_state.federation_key = ()
 
 # Section de téléchargement des fichiers
 st.markdown('## 📂 Charger vos fichiers')
@@ -808,57 +724,167 @@ with st.container():
             st.markdown("<h5>Fichier Excel Route Optique (.xlsx, .xls)</h5>", unsafe_allow_html=True)
             uploaded_route_optique = st.file_uploader("Glissez-déposez ou cliquez pour charger", type=['xlsx', 'xls'], key="route_optique_uploader", label_visibility="collapsed")
             if uploaded_route_optique:
-                st.session_state.route_optique_df = pd.read_excel(uploaded_route_optique, header=None)
-                st.success("Fichier Route Optique chargé !")
+                # Le fichier est parsé et indexé en arrière-plan, sauf si une session a déjà chargé le même contenu ;
+                # une nouvelle version du fichier ne réindexe que les lignes ajoutées ou supprimées
+                if uploaded_route_optique.file_id != st.session_state.route_optique_file_id:
+                    rop_data = uploaded_route_optique.getvalue()
+                    previous = st.session_state.rop_handle.dataset if st.session_state.rop_handle is not None else None
+                    replace_handle('rop_handle', None)
+                    start_ingestion('rop_ingestion', route_optique.dataset_key('rop', route_optique.content_hash(rop_data)),
+                                    route_optique.build_rop_dataset, rop_data, previous=previous)
+                    st.session_state.rop_diff_report = None
+                    st.session_state.route_optique_file_id = uploaded_route_optique.file_id
+                ingestion = collect_ingestion('rop_ingestion', 'rop_handle', 'route_optique_file_id',
+                                              "Le fichier Route Optique n'a pas pu être chargé")
+                if ingestion is not None:
+                    previous, current = ingestion['previous'], st.session_state.rop_handle.dataset
+                    if previous is not None and previous['digest'] != current['digest']:
+                        st.session_state.rop_diff_report = route_optique.rop_diff_report(
+                            previous['df'], current['df'], previous['row_hashes'], current['row_hashes'])
+                if st.session_state.rop_ingestion is not None:
+                    show_ingestion_progress('rop_ingestion', "Lecture et indexation du fichier Route Optique...")
+                elif st.session_state.rop_handle is not None:
+                    st.success("Fichier Route Optique chargé !")
+                diff_report = st.session_state.rop_diff_report
+                if diff_report is not None:
+                    changes = diff_report['Changement'].value_counts()
+                    st.info(f"Nouvelle version : {changes.get('ajoutée', 0)} route(s) ajoutée(s), "
+                            f"{changes.get('supprimée', 0)} supprimée(s), {changes.get('modifiée', 0)} modifiée(s).")
+                    if not diff_report.empty:
+                        with st.expander("Détail des changements"):
+                            st.dataframe(diff_report, width="stretch", hide_index=True)
     with col2:
         with st.container(border=True):
             st.markdown("<h5>Fichier Excel STBAN (optionnel)</h5>", unsafe_allow_html=True)
             uploaded_stban = st.file_uploader("Glissez-déposez ou cliquez pour charger", type=['xlsx', 'xls'], key="stban_uploader", label_visibility="collapsed")
             if uploaded_stban:
-                st.session_state.stban_df = pd.read_excel(uploaded_stban)
-                st.success("Fichier STBAN chargé !")
+                # Le nombre de prises de toutes les boîtes est calculé une seule fois par contenu de fichier,
+                # en arrière-plan et en même temps que l'indexation du ROP
+                if uploaded_stban.file_id != st.session_state.stban_file_id:
+                    stban_data = uploaded_stban.getvalue()
+                    previous = st.session_state.stban_handle.dataset if st.session_state.stban_handle is not None else None
+                    replace_handle('stban_handle', None)
+                    start_ingestion('stban_ingestion', route_optique.dataset_key('stban', route_optique.content_hash(stban_data)),
+                                    route_optique.build_stban_dataset, stban_data, uploaded_stban.name, previous=previous)
+                    st.session_state.stban_file_id = uploaded_stban.file_id
+                collect_ingestion('stban_ingestion', 'stban_handle', 'stban_file_id', "Le fichier STBAN n'a pas pu être chargé")
+                if st.session_state.stban_ingestion is not None:
+                    show_ingestion_progress('stban_ingestion', "Lecture du fichier STBAN et calcul des prises...")
+                elif st.session_state.stban_handle is not None:
+                    if st.session_state.stban_handle.dataset['prises_table'] is None:
+                        st.warning("Colonnes 'REF_PBO_PRISE' ou 'REF_PBO_PTO' introuvables dans le fichier STBAN.")
+                    st.success("Fichier STBAN chargé !")
 
 # Logique principale de l'application
-if st.session_state.route_optique_df is None:
-    st.warning("Veuillez charger un fichier Excel Route Optique pour commencer l'analyse.")
+if st.session_state.rop_handle is None:
+    if st.session_state.rop_ingestion is not None:
+        st.info("Indexation du fichier Route Optique en cours : la recherche sera disponible dès la fin du chargement.")
+    else:
+        st.warning("Veuillez charger un fichier Excel Route Optique pour commencer l'analyse.")
 else:
-    df = st.session_state.route_optique_df
-    if not st.session_state.all_unique_values:
-        st.session_state.all_unique_values = get_all_unique_values(df)
-    # La liste des noms de boîtes est toujours extraite du fichier ROP si disponible
-    # Le fichier STBAN est utilisé pour enrichir cette liste si présent
-    if not st.session_state.boite_names or (st.session_state.stban_df is not None and not st.session_state.get("stban_processed", False)):
-        # Initialiser boite_names avec les valeurs du fichier ROP
-        st.session_state.boite_names = extract_boite_names_from_rop_df(df)
-        if st.session_state.stban_df is not None:
-            # Si le fichier STBAN est chargé, ajouter ses noms de boîtes et supprimer les doublons
-            st.session_state.boite_names.extend(extract_stban_boite_names_from_df(st.session_state.stban_df))
-            st.session_state.boite_names = sorted(list(set(st.session_state.boite_names)))
-            st.session_state.stban_processed = True # Marquer que le STBAN a été traité pour les noms de boîtes
-        
+    rop_dataset = st.session_state.rop_handle.dataset
+    stban_dataset = st.session_state.stban_handle.dataset if st.session_state.stban_handle is not None else None
+    df = rop_dataset['df']
+    prises_table = stban_dataset['prises_table'] if stban_dataset is not None else None
+    # La liste des noms de boîtes est toujours extraite du fichier ROP ; le fichier STBAN l'enrichit s'il est présent
+    boites_key = route_optique.dataset_key('boites', st.session_state.rop_handle.key,
+                                           st.session_state.stban_handle.key if stban_dataset is not None else None)
+    # Construite en arrière-plan ; la liste du même ROP (ex. sans STBAN) reste utilisable pendant sa mise à jour
+    if st.session_state.boites_handle is not None and st.session_state.boites_handle.key[2] != st.session_state.rop_handle.key:
+        replace_handle('boites_handle', None)
+    boites_handle, boites_ingestion = st.session_state.boites_handle, st.session_state.boites_ingestion
+    if ((boites_handle is None or boites_handle.key != boites_key)
+            and (boites_ingestion is None or boites_ingestion['key'] != boites_key)
+            and st.session_state.ingestion_errors.get('boites_ingestion', (None,))[0] != boites_key):
+        start_ingestion('boites_ingestion', boites_key, route_optique.build_boite_names_dataset, rop_dataset, stban_dataset)
+    collect_ingestion('boites_ingestion', 'boites_handle')
+    boites_dataset = st.session_state.boites_handle.dataset if st.session_state.boites_handle is not None else None
 
     with st.container(border=True):
         st.markdown('## 🔍 Recherche avec autocomplétion')
         search_term = ''
-        if st.session_state.route_optique_df is not None:
+        search_mode = SEARCH_MODES[0]
+        if df is not None:
+            search_mode = st.radio("Mode de recherche", SEARCH_MODES, horizontal=True, key="search_mode")
+        if df is not None and search_mode != SEARCH_MODES[0]:
+            # Recherche inverse : câble, tube/fibre ou tiroir/position vers les lignes ROP
+            if search_mode == SEARCH_MODES[1]:
+                st.markdown("<h5>Recherche par câble, tube et fibre</h5>", unsafe_allow_html=True)
+                cable = st.text_input("Référence du câble (ex. TE2-CA-0000101_72F0)", key="lookup_cable").strip()
+                lookup_col1, lookup_col2 = st.columns(2)
+                with lookup_col1:
+                    tube = st.text_input("Tube (ex. T1)", key="lookup_tube").strip()
+                with lookup_col2:
+                    fibre = st.text_input("Fibre (ex. F3)", key="lookup_fibre").strip()
+                if bool(tube) != bool(fibre):
+                    # Un tube sans fibre (ou l'inverse) n'est pas indexé : on ne l'ignore pas en silence
+                    st.warning("Saisissez à la fois le tube et la fibre (ou aucun des deux pour chercher tout le câble).")
+                    lookup = None
+                elif cable and tube and fibre:
+                    lookup = ('cable_tube_fibre', cable, tube, fibre)
+                elif tube and fibre:
+                    lookup = ('tube_fibre', tube, fibre)
+                elif cable:
+                    lookup = ('cable', cable)
+                else:
+                    lookup = None
+            elif search_mode == SEARCH_MODES[2]:
+                st.markdown("<h5>Recherche par tiroir et position</h5>", unsafe_allow_html=True)
+                lookup_col1, lookup_col2 = st.columns(2)
+                with lookup_col1:
+                    tiroir = st.text_input("Tiroir (ex. T01)", key="lookup_tiroir").strip()
+                with lookup_col2:
+                    position = st.text_input("Position (facultative)", key="lookup_position").strip()
+                lookup = ('tiroir_position', tiroir, position) if tiroir and position else ('tiroir', tiroir) if tiroir else None
+            else:
+                st.markdown("<h5>Recherche dans toutes les cellules</h5>", unsafe_allow_html=True)
+                fragment = st.text_input(f"Fragment de texte (au moins {route_optique.FULLTEXT_MIN_QUERY_LENGTH} caractères)",
+                                         key="fulltext_input").strip()
+                if 0 < len(fragment) < route_optique.FULLTEXT_MIN_QUERY_LENGTH:
+                    st.info(f"Saisissez au moins {route_optique.FULLTEXT_MIN_QUERY_LENGTH} caractères.")
+                lookup = None
+                if len(fragment) >= route_optique.FULLTEXT_MIN_QUERY_LENGTH:
+                    search_term = fragment
+            if lookup is not None:
+                search_term = ' / '.join(route_optique.normalize_lookup_value(value) for value in lookup[1:])
+        elif df is not None and boites_dataset is None:
+            st.markdown("<h5>Recherche par boîte</h5>", unsafe_allow_html=True)
+            if st.session_state.boites_ingestion is not None:
+                show_ingestion_progress('boites_ingestion', "Préparation de la liste des boîtes (autocomplétion, recherche approchée)...")
+            else:
+                st.error("La liste des boîtes n'a pas pu être construite : "
+                         f"{st.session_state.ingestion_errors.get('boites_ingestion', (None, 'erreur inconnue'))[1]}")
+            search_term = None
+        elif df is not None:
             st.markdown("<h5>Recherche par boîte</h5>", unsafe_allow_html=True)
+            if st.session_state.boites_ingestion is not None:
+                show_ingestion_progress('boites_ingestion', "Mise à jour de la liste des boîtes avec le fichier STBAN...")
+            elif st.session_state.ingestion_errors.get('boites_ingestion', (None,))[0] == boites_key:
+                st.warning("La liste des boîtes n'a pas pu être mise à jour avec le fichier STBAN : "
+                           f"{st.session_state.ingestion_errors['boites_ingestion'][1]}")
             search_query = st.text_input("Saisissez une partie du nom de la boîte ou sélectionnez dans la liste", key="boite_text_input", label_visibility="collapsed")
             
-            # Filtrer les suggestions en fonction de la saisie
-            if search_query:
-                filtered_boite_names = [name for name in st.session_state.boite_names if search_query.lower() in name.lower()]
-            else:
-                filtered_boite_names = st.session_state.boite_names
+            # Filtrer les suggestions en fonction de la saisie (index de trigrammes, résultats plafonnés)
+            filtered_boite_names = search_boite_names(boites_dataset['search_index'], search_query)
+            if len(filtered_boite_names) == BOITE_SUGGESTIONS_LIMIT:
+                st.caption(f"Affichage limité aux {BOITE_SUGGESTIONS_LIMIT} premières boîtes : précisez la saisie pour affiner la liste.")
 
             # Utiliser un selectbox pour la sélection avec les options filtrées
             # Si la liste filtrée est vide, afficher un message
+            # Sans correspondance exacte, on propose les boîtes au nom proche (fautes de frappe)
+            if not filtered_boite_names and search_query.strip():
+                filtered_boite_names = fuzzy_search(boites_dataset['fuzzy_index'], boites_dataset['boite_names'], search_query)
+                if filtered_boite_names:
+                    st.info(f"Aucune boîte ne contient « {search_query.strip()} » : boîtes au nom proche.")
             if not filtered_boite_names:
                 st.info("Aucune boîte correspondante trouvée.")
                 search_term = None # Pas de terme de recherche si aucune correspondance
             else:
                 search_term = st.selectbox("Sélectionnez une boîte", filtered_boite_names, key="boite_selectbox", label_visibility="collapsed")
 
-            if st.session_state.stban_df is None:
+            if st.session_state.stban_ingestion is not None:
+                st.info("Calcul du nombre de prises en cours : il s'affichera dès que le fichier STBAN sera indexé.")
+            elif stban_dataset is None:
                 st.info("Le fichier STBAN n'est pas chargé. Le calcul du nombre de prises ne sera pas disponible.")
         else:
             st.info("Veuillez charger un fichier Excel Route Optique pour activer la recherche.")
@@ -866,39 +892,195 @@ else:
 
         # La recherche se déclenche automatiquement si un terme est sélectionné ou saisi
         if search_term: # Condition pour lancer la recherche
-            st.markdown(f'### Résultats pour : <span class="search-term-highlight">{search_term}</span>', unsafe_allow_html=True)
-
-            # Affichage du nombre de prises
-            if st.session_state.stban_df is not None: # Le calcul des prises est toujours lié à la recherche par boîte
-                with st.spinner("Calcul du nombre de prises..."):
-                    prises_count = calculate_prises_count(st.session_state.stban_df, search_term)
-                if prises_count is not None:
-                    st.markdown(f'<div class="prises-badge">🔌 Nombre de prises : <strong>{prises_count}</strong></div>', unsafe_allow_html=True)
-            
-            # Recherche des ROPs
-            # Recherche des ROPs
-            # Recherche de la colonne contenant la valeur sélectionnée et application de la condition 'STOCKEE'
-            mask = df == search_term
-            is_excluded_col = np.array(["EXTREMI" in col for col in df.columns.astype(str)])
-            column_indices = np.where(mask.any(axis=0) & ~is_excluded_col)[0]
-
-            if len(column_indices) > 0:
-                col_index = column_indices[0]
-                matching_rows = df[(df.iloc[:, col_index] == search_term) &
-                                   (df.iloc[:, col_index + 3] == "STOCKEE")]
+            st.markdown(f'### Résultats pour : <span class="search-term-highlight">{escape(search_term)}</span>', unsafe_allow_html=True)
+
+            if search_mode == SEARCH_MODES[0]:
+                # Affichage du nombre de prises
+                if stban_dataset is not None: # Le calcul des prises est toujours lié à la recherche par boîte
+                    prises_count = calculate_prises_count(prises_table, search_term)
+                    if prises_count is not None:
+                        st.markdown(f'<div class="prises-badge">🔌 Nombre de prises : <strong>{prises_count}</strong></div>', unsafe_allow_html=True)
+
+                # Recherche des ROPs 'STOCKEE' via l'index inversé construit au chargement
+                matching_rows = search_rop_rows(df, rop_dataset['boite_index'], search_term)
+            elif search_mode == SEARCH_MODES[3]:
+                # Lignes dont une cellule contient le fragment (index de trigrammes construit à la première recherche)
+                matching_rows = df.iloc[fulltext_search(route_optique.get_fulltext_index(rop_dataset), search_term)]
             else:
-                matching_rows = pd.DataFrame()
+                # Toutes les routes qui passent par le câble, la fibre ou qui partent du tiroir/position
+                matching_rows = df.iloc[reverse_lookup(rop_dataset['reverse_index'], *lookup)]
 
             if not matching_rows.empty:
                 st.success(f"{len(matching_rows)} ROP trouvée(s).")
-                for index, row in matching_rows.iterrows():
+                if search_mode == SEARCH_MODES[0]:
+                    route_export_buttons(rop_dataset, prises_table, [search_term], "routes_boite", "box_export")
+
+                # Pagination : seules les ROP de la page courante sont construites et envoyées au navigateur
+                page_size, page = RESULTS_PAGE_SIZES[0], 1
+                if len(matching_rows) > RESULTS_PAGE_SIZES[0]:
+                    page_col1, page_col2 = st.columns(2)
+                    with page_col1:
+                        page_size = st.selectbox("ROP par page", RESULTS_PAGE_SIZES, key="results_page_size")
+                    page_count = -(-len(matching_rows) // page_size)
+                    with page_col2:
+                        page = st.number_input(f"Page (sur {page_count})", min_value=1, max_value=page_count, value=1, step=1,
+                                               key=f"results_page_{search_term}_{page_size}")
+                page_rows = matching_rows.iloc[(page - 1) * page_size:page * page_size]
+
+                for index, row in page_rows.iterrows():
                     # Tenter d'extraire le base_id pour le titre de l'expander
                     # Le base_id est souvent la première valeur non-NaN de la ligne
                     base_id_for_expander = row.dropna().iloc[0] if not row.dropna().empty else 'Détails'
                     expander_title = f"ROP {index + 1} - {base_id_for_expander}"
                     with st.expander(expander_title):
-                        display_detailed_route(row, st.session_state.route_optique_df)
+                        display_detailed_route(row, rop_dataset)
             else:
                 st.warning("Aucun résultat trouvé pour votre recherche.")
 
-
+    # Recherche groupée : une liste de boîtes en entrée, un rapport consolidé en sortie
+    with st.expander("📋 Recherche groupée (liste de boîtes)"):
+        batch_text = st.text_area("Collez une liste de boîtes (une par ligne)", key="batch_text_input")
+        batch_csv = st.file_uploader("Ou chargez un fichier CSV (noms de boîtes en première colonne)", type=['csv', 'txt'], key="batch_csv_uploader")
+        if st.button("Lancer la recherche groupée", key="batch_search_button"):
+            batch_names = parse_batch_boite_names(batch_text, batch_csv.getvalue() if batch_csv else None)
+            if not batch_names:
+                st.info("Aucune boîte à rechercher.")
+            else:
+                start_time = time.perf_counter()
+                report_df = run_batch_query(df, rop_dataset['boite_index'], prises_table,
+                                            rop_dataset['route_segments'], batch_names)
+                elapsed = max(time.perf_counter() - start_time, 1e-9)
+                st.success(f"{len(batch_names)} boîte(s) traitée(s) en {elapsed:.2f} s ({len(batch_names) / elapsed:,.0f} boîtes/s), {int(report_df['ROP'].notna().sum())} ROP trouvée(s).")
+                st.dataframe(report_df, width="stretch", hide_index=True)
+                dl_col1, dl_col2 = st.columns(2)
+                with dl_col1:
+                    st.download_button("⬇️ Télécharger (Excel)", batch_report_to_excel(report_df), file_name="rapport_rop.xlsx",
+                                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                with dl_col2:
+                    st.download_button("⬇️ Télécharger (CSV)", report_df.to_csv(index=False, sep=';').encode('utf-8-sig'),
+                                       file_name="rapport_rop.csv", mime="text/csv")
+                route_export_buttons(rop_dataset, prises_table, batch_names, "routes_rop", "batch_export")
+
+    # Requêtes sur le graphe du réseau fibre, construit à la première requête et partagé entre sessions
+    with st.expander("🕸️ Réseau fibre (boîtes en aval, câbles, chemins)"):
+        graph_query = st.radio("Requête", ["Boîtes en aval", "Routes par câble", "Plus court chemin"], key="graph_query", horizontal=True)
+        if graph_query == "Boîtes en aval":
+            graph_node = st.text_input("Boîte de départ (BPE, CAS, PBO...)", key="graph_downstream_input").strip()
+            if graph_node:
+                downstream = downstream_nodes(route_optique.get_fiber_graph(rop_dataset), graph_node)
+                st.success(f"{len(downstream)} boîte(s) en aval de {graph_node}.")
+                if downstream:
+                    st.dataframe({'Boîte': downstream}, width="stretch", hide_index=True)
+        elif graph_query == "Routes par câble":
+            graph_cable = st.text_input("Référence du câble (ex. TE2-CA-0000101_72F0)", key="graph_cable_input").strip()
+            if graph_cable:
+                cable_rows = routes_through(route_optique.get_fiber_graph(rop_dataset), graph_cable)
+                st.success(f"{len(cable_rows)} ROP empruntent le câble {graph_cable}.")
+                if len(cable_rows):
+                    st.dataframe(route_optique.summarize_rop_rows(df, rop_dataset['route_segments'], cable_rows),
+                                 width="stretch", hide_index=True)
+        else:
+            path_col1, path_col2 = st.columns(2)
+            with path_col1:
+                path_source = st.text_input("Boîte de départ", key="graph_path_source").strip()
+            with path_col2:
+                path_target = st.text_input("Boîte d'arrivée", key="graph_path_target").strip()
+            if path_source and path_target:
+                path = shortest_path(route_optique.get_fiber_graph(rop_dataset), path_source, path_target)
+                if path is None:
+                    st.warning("Aucun chemin entre ces deux boîtes.")
+                else:
+                    st.success(" → ".join(path))
+
+    # Vue triable du nombre de prises de toutes les boîtes du STBAN
+    if prises_table is not None:
+        with st.expander("🔌 Nombre de prises par boîte"):
+            prises_view = prises_table.drop('', errors='ignore').sort_values(ascending=False)
+            st.dataframe(prises_view.reset_index(), width="stretch", hide_index=True)
+
+# Recherche multi-fichiers : un couple ROP/STBAN par PM ou NRO, interrogés en parallèle
+st.markdown('## 🗂️ Recherche multi-fichiers')
+with st.expander("Plusieurs fichiers ROP/STBAN (un couple par PM ou NRO)"):
+    federated_col1, federated_col2 = st.columns(2)
+    with federated_col1:
+        federated_rop_files = st.file_uploader("Fichiers Route Optique", type=['xlsx', 'xls'], accept_multiple_files=True,
+                                               key="federated_rop_uploader")
+    with federated_col2:
+        federated_stban_files = st.file_uploader("Fichiers STBAN (optionnels)", type=['xlsx', 'xls'], accept_multiple_files=True,
+                                                 key="federated_stban_uploader")
+    federation_pairs = []
+    if federated_rop_files:
+        # Chaque ROP est associé par défaut au STBAN dont le nom lui ressemble le plus
+        stban_by_name = {stban_file.name: stban_file for stban_file in federated_stban_files or []}
+        default_pairs = route_optique.pair_stban_files([rop_file.name for rop_file in federated_rop_files], list(stban_by_name))
+        stban_choices = ["(aucun)"] + list(stban_by_name)
+        for rop_file in federated_rop_files:
+            default_stban = default_pairs[rop_file.name]
+            stban_choice = st.selectbox(f"STBAN associé à {rop_file.name}", stban_choices,
+                                        index=stban_choices.index(default_stban) if default_stban else 0,
+                                        key=f"federated_pair_{rop_file.file_id}")
+            federation_pairs.append((rop_file, stban_by_name.get(stban_choice)))
+
+    federation_key = tuple((rop_file.file_id, stban_file.file_id if stban_file is not None else None)
+                           for rop_file, stban_file in federation_pairs)
+    if federation_key != st.session_state.federation_key:
+        with st.spinner(f"Indexation de {len(federation_pairs)} couple(s) ROP/STBAN en parallèle..."):
+            # Les fichiers absents du cache disque sont parsés et indexés dans un pool de processus
+            used_stban_files = {stban_file.file_id: stban_file for _, stban_file in federation_pairs if stban_file is not None}
+            route_optique.prepare_federated_files(
+                [('rop', rop_file.getvalue(), rop_file.name) for rop_file, _ in federation_pairs]
+                + [('stban', stban_file.getvalue(), stban_file.name) for stban_file in used_stban_files.values()])
+            federation_sources = [acquire_federated_source(rop_file, stban_file) for rop_file, stban_file in federation_pairs]
+        for source in st.session_state.federation_sources:
+            for handle in (source['rop'], source['stban']):
+                if handle is not None:
+                    handle.release()
+        st.session_state.federation_sources = federation_sources
+        st.session_state.federation_key = federation_key
+
+    if st.session_state.federation_sources:
+        federated_names = parse_batch_boite_names(st.text_area("Boîte(s) à rechercher dans tous les fichiers (une par ligne)",
+                                                               key="federated_text_input"))
+        if federated_names:
+            start_time = time.perf_counter()
+            federated_report = run_federated_batch_query(
+                [{'label': source['label'], 'rop': source['rop'].dataset,
+                  'stban': source['stban'].dataset if source['stban'] is not None else None}
+                 for source in st.session_state.federation_sources],
+                federated_names)
+            elapsed = max(time.perf_counter() - start_time, 1e-9)
+            st.success(f"{len(federated_names)} boîte(s) recherchée(s) dans {len(st.session_state.federation_sources)} fichier(s) "
+                       f"en {elapsed:.2f} s, {int(federated_report['ROP'].notna().sum())} ROP trouvée(s).")
+            st.dataframe(federated_report, width="stretch", hide_index=True)
+            federated_dl_col1, federated_dl_col2 = st.columns(2)
+            with federated_dl_col1:
+                st.download_button("⬇️ Télécharger (Excel)", batch_report_to_excel(federated_report), file_name="rapport_rop_multi.xlsx",
+                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="federated_download_xlsx")
+            with federated_dl_col2:
+                st.download_button("⬇️ Télécharger (CSV)", federated_report.to_csv(index=False, sep=';').encode('utf-8-sig'),
+                                   file_name="rapport_rop_multi.csv", mime="text/csv", key="federated_download_csv")
+    else:
+        st.info("Chargez un ou plusieurs fichiers Route Optique pour les interroger ensemble.")
+
+# Panneau de debug (optionnel) : mesures des phases coûteuses, communes à toutes les sessions du serveur
+with st.sidebar:
+    if st.checkbox("🛠️ Mode debug : performances", key="debug_perf"):
+        rss = current_rss_bytes()
+        if rss is not None:
+            st.metric("Mémoire résidente du serveur", f"{rss / 1e6:,.0f} Mo")
+        st.dataframe(phase_stats(), width="stretch", hide_index=True)
+        registry_stats = dataset_registry.stats()
+        st.caption(f"Registre des jeux de données : {registry_stats['entries']} entrée(s), "
+                   f"{registry_stats['bytes'] / 1e6:,.0f} / {registry_stats['memory_budget_bytes'] / 1e6:,.0f} Mo, "
+                   f"{registry_stats['hits']} réutilisation(s), {registry_stats['misses']} construction(s), "
+                   f"{registry_stats['evictions']} éviction(s), {registry_stats['expirations']} expiration(s)"
+                   + (f" (durée de vie {registry_stats['ttl_seconds'] // 60} min)." if registry_stats['ttl_seconds'] else "."))
+        st.dataframe(registry_stats['datasets'], width="stretch", hide_index=True)
+
+# Export des mesures au format Prometheus (textfile collector) si ROP_METRICS_FILE est défini
+if os.environ.get('ROP_METRICS_FILE'):
+    try:
+        write_prometheus(os.environ['ROP_METRICS_FILE'])
+    except OSError as error:
+        # L'export des mesures ne doit jamais interrompre l'affichage de la page
+        logging.getLogger('route_optique.perf').warning("Export Prometheus impossible : %s", error)